@@ -1,13 +1,22 @@
 # [file name]: app/__init__.py
 from flask import Flask
 from flask_cors import CORS
+from app.config import Config
+from app.utils.metricas import instalar_metricas
+from app.utils.perfilado import instalar_perfilado
+from app.utils.respuestas import ProveedorJSON, instalar_compresion
 
 def create_app():
     app = Flask(__name__)
-    app.config['JSON_SORT_KEYS'] = False
-    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+    # JSON compacto y sin ordenar claves (Flask 3 ya no lee JSON_SORT_KEYS)
+    app.json = ProveedorJSON(app)
     
     CORS(app)
+    # Se instala antes que la compresión para que su tiempo quede incluido
+    instalar_metricas(app)
+    instalar_compresion(app, Config.COMPRESION_MIN_BYTES, Config.COMPRESION_NIVEL)
+    if Config.PERFILADO_HABILITADO:
+        instalar_perfilado(app, Config.PERFILES_FOLDER, Config.PERFILADO_TOKEN, Config.PERFILADO_TOP)
     
     # Importar y registrar blueprints DIRECTAMENTE
     from app.routes.recurso_routes import recurso_bp
@@ -10,6 +10,26 @@ class Config:
     # Configuración de reportes PDF
     PDF_REPORTS_FOLDER = os.path.join(os.path.dirname(__file__), 'reports')
     
+    # Ingesta paralela de consumos: archivos desde este tamaño se guardan en
+    # TEMP_FOLDER y se parsean por bloques en varios procesos
+    INGESTA_PARALELA_PROCESOS = int(os.environ.get('INGESTA_PARALELA_PROCESOS') or os.cpu_count() or 1)
+    INGESTA_PARALELA_MIN_BYTES = int(os.environ.get('INGESTA_PARALELA_MIN_BYTES') or 64 * 1024 * 1024)
+    
+    # Caché de resultados de análisis y resumen de facturación
+    CACHE_ANALISIS_ENTRADAS = int(os.environ.get('CACHE_ANALISIS_ENTRADAS') or 256)
+    CACHE_ANALISIS_TTL = float(os.environ.get('CACHE_ANALISIS_TTL') or 300)
+    
+    # Compresión gzip de respuestas desde este tamaño
+    COMPRESION_MIN_BYTES = int(os.environ.get('COMPRESION_MIN_BYTES') or 1024)
+    COMPRESION_NIVEL = int(os.environ.get('COMPRESION_NIVEL') or 6)
+    
+    # Perfilado de peticiones con cProfile (X-Perfilar o ?perfilar); apagado por defecto.
+    # Con PERFILADO_TOKEN solo se perfilan las peticiones que envían ese valor.
+    PERFILADO_HABILITADO = os.environ.get('PERFILADO_HABILITADO', '').lower() in ('1', 'true', 'si')
+    PERFILADO_TOKEN = os.environ.get('PERFILADO_TOKEN') or None
+    PERFILADO_TOP = int(os.environ.get('PERFILADO_TOP') or 20)
+    PERFILES_FOLDER = os.path.join(os.path.dirname(__file__), 'profiles')
+    
     # Crear carpetas si no existen
     @staticmethod
     def init_folders():
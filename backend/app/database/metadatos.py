@@ -0,0 +1,573 @@
+import secrets
+import xml.etree.ElementTree as ET
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from app.models import Factura
+
+# Contadores que se guardan como decimales; el resto son enteros
+CONTADORES_DECIMALES = ('ingresos_totales', 'factura_minima', 'factura_maxima')
+
+# Colecciones con versión de datos propia
+COLECCIONES = ('recursos', 'categorias', 'clientes', 'facturas')
+
+
+def fecha_a_dia(fecha):
+    """
+    Convierte una fecha dd/mm/yyyy a su ordinal de día.
+    
+    Returns:
+        int: Ordinal del día o None si la fecha no es válida
+    """
+    try:
+        return datetime.strptime(fecha, '%d/%m/%Y').toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def dia_a_fecha(dia):
+    """Convierte un ordinal de día a una fecha dd/mm/yyyy."""
+    return datetime.fromordinal(dia).strftime('%d/%m/%Y')
+
+
+class Metadatos:
+    """
+    Estructuras derivadas de data.xml que XMLManager mantiene en cada
+    escritura para no recorrer los datos completos en las consultas.
+    """
+    
+    def __init__(self):
+        # Ventas pre-agregadas por día (ordinal)
+        self._dias = []                   # Días con ventas, ordenados
+        self._ventas_configuracion = {}   # {dia: {id_config: {ingresos, horas, instancias}}}
+        self._ventas_recurso = {}         # {dia: {nombre: {ingresos, horas, cantidad, instancias}}}
+        
+        # Índice ordenado de facturas por fecha: [(dia, numero)]
+        self._indice_fechas = []
+        
+        # Contadores del sistema
+        self._contadores = {
+            'recursos': 0,
+            'categorias': 0,
+            'configuraciones': 0,
+            'clientes': 0,
+            'instancias_vigentes': 0,
+            'instancias_canceladas': 0,
+            'facturas': 0,
+            'ultima_factura': 0,
+            'ingresos_totales': 0.0,
+            'factura_minima': None,
+            'factura_maxima': None
+        }
+        self._clientes_facturados = set()
+        
+        # Saldo pendiente de facturar:
+        # {nit: {nombre, instancias: {id: {nombre, id_configuracion, consumos, horas, monto}}}}
+        self._pendientes = {}
+        
+        # Archivos de consumos ya aplicados: {sha256: {fecha, consumos}}
+        self._archivos_aplicados = {}
+        
+        # Versión de datos por colección; sube con cada cambio. La época identifica
+        # el archivo, porque al inicializar el sistema las versiones vuelven a cero
+        self._epoca = secrets.token_hex(4)
+        self._versiones = dict.fromkeys(COLECCIONES, 0)
+        
+        # Catálogo derivado de recursos y categorías (no se persiste)
+        self._configuraciones = {}        # {id_config: {categoria_id, categoria_nombre, configuracion_nombre, costo_hora}}
+    
+    @property
+    def configuraciones(self):
+        return self._configuraciones
+    
+    @property
+    def contadores(self):
+        return self._contadores
+    
+    @property
+    def clientes_facturados(self):
+        return self._clientes_facturados
+    
+    @property
+    def pendientes(self):
+        return self._pendientes
+    
+    @property
+    def archivos_aplicados(self):
+        return self._archivos_aplicados
+    
+    @property
+    def epoca(self):
+        return self._epoca
+    
+    @property
+    def versiones(self):
+        return self._versiones
+    
+    @property
+    def indice_fechas(self):
+        return self._indice_fechas
+    
+    # ==================== VENTAS DIARIAS ====================
+    
+    def registrar_factura(self, factura):
+        """
+        Cuenta una factura, la indexa y la suma a las ventas pre-agregadas
+        de su día.
+        """
+        self._contar_factura(factura.numero, factura.nit_cliente, factura.monto_total)
+        self._versiones['facturas'] += 1
+        
+        dia = fecha_a_dia(factura.fecha)
+        if dia is None:
+            return
+        
+        insort(self._indice_fechas, (dia, factura.numero))
+        self._registrar_ventas(dia, factura)
+    
+    def _registrar_ventas(self, dia, factura):
+        # Los costos se redondean como en Factura.to_xml_element, así las ventas
+        # acumuladas al facturar coinciden con las reconstruidas desde data.xml
+        if dia not in self._ventas_configuracion:
+            insort(self._dias, dia)
+            self._ventas_configuracion[dia] = {}
+            self._ventas_recurso[dia] = {}
+        
+        por_config = self._ventas_configuracion[dia]
+        por_recurso = self._ventas_recurso[dia]
+        
+        for detalle in factura.detalles:
+            if detalle.id_configuracion is not None:
+                acumulado = por_config.setdefault(detalle.id_configuracion, {
+                    'ingresos': 0.0, 'horas': 0.0, 'instancias': 0
+                })
+                acumulado['ingresos'] += round(detalle.costo_total, 2)
+                acumulado['horas'] += detalle.horas_consumidas
+                acumulado['instancias'] += 1
+            
+            for detalle_recurso in detalle.detalles_recursos:
+                acumulado = por_recurso.setdefault(detalle_recurso['recurso'], {
+                    'ingresos': 0.0, 'horas': 0.0, 'cantidad': 0.0, 'instancias': 0
+                })
+                acumulado['ingresos'] += round(detalle_recurso['costo'], 2)
+                acumulado['horas'] += detalle_recurso['horas']
+                acumulado['cantidad'] += detalle_recurso['cantidad']
+                acumulado['instancias'] += 1
+    
+    def _dias_en_rango(self, dia_inicio, dia_fin):
+        """Días con ventas dentro del rango [dia_inicio, dia_fin]."""
+        inicio = bisect_left(self._dias, dia_inicio)
+        fin = bisect_right(self._dias, dia_fin)
+        return self._dias[inicio:fin]
+    
+    def ventas_por_configuracion(self, dia_inicio, dia_fin):
+        """
+        Suma las ventas diarias por configuración en un rango de días.
+        
+        Returns:
+            dict: {id_config: {ingresos, horas, instancias}}
+        """
+        return self._sumar_dias(self._ventas_configuracion, dia_inicio, dia_fin)
+    
+    def ventas_por_recurso(self, dia_inicio, dia_fin):
+        """
+        Suma las ventas diarias por recurso en un rango de días.
+        
+        Returns:
+            dict: {nombre_recurso: {ingresos, horas, cantidad, instancias}}
+        """
+        return self._sumar_dias(self._ventas_recurso, dia_inicio, dia_fin)
+    
+    def _sumar_dias(self, ventas, dia_inicio, dia_fin):
+        total = {}
+        for dia in self._dias_en_rango(dia_inicio, dia_fin):
+            for clave, valores in ventas[dia].items():
+                acumulado = total.setdefault(clave, dict.fromkeys(valores, 0))
+                for campo, valor in valores.items():
+                    acumulado[campo] += valor
+        return total
+    
+    # ==================== CONTADORES ====================
+    
+    def _contar_factura(self, numero, nit_cliente, monto):
+        # Se redondea aquí, así da lo mismo al facturar que al reconstruir desde el archivo
+        monto = round(monto, 2)
+        contadores = self._contadores
+        contadores['facturas'] += 1
+        contadores['ultima_factura'] = max(contadores['ultima_factura'], numero)
+        contadores['ingresos_totales'] = round(contadores['ingresos_totales'] + monto, 2)
+        
+        if contadores['factura_minima'] is None or monto < contadores['factura_minima']:
+            contadores['factura_minima'] = monto
+        if contadores['factura_maxima'] is None or monto > contadores['factura_maxima']:
+            contadores['factura_maxima'] = monto
+        
+        self._clientes_facturados.add(nit_cliente)
+    
+    def registrar_recurso(self, anterior, nuevo):
+        """
+        Actualiza los contadores al reemplazar un elemento <recurso>.
+        
+        Args:
+            anterior: Elemento que se reemplaza o elimina (None si es nuevo)
+            nuevo: Elemento que se guarda (None si se elimina)
+        """
+        self._contadores['recursos'] += (nuevo is not None) - (anterior is not None)
+        self._versiones['recursos'] += 1
+    
+    def registrar_categoria(self, anterior, nuevo):
+        """Actualiza los contadores al reemplazar un elemento <categoria>."""
+        self._contadores['categorias'] += (nuevo is not None) - (anterior is not None)
+        self._versiones['categorias'] += 1
+        self._contadores['configuraciones'] += (
+            self._contar_configuraciones(nuevo) - self._contar_configuraciones(anterior)
+        )
+    
+    def registrar_cliente(self, anterior, nuevo):
+        """Actualiza los contadores al reemplazar un elemento <cliente>."""
+        self._contadores['clientes'] += (nuevo is not None) - (anterior is not None)
+        self._versiones['clientes'] += 1
+        
+        vigentes_antes, canceladas_antes = self._contar_instancias(anterior)
+        vigentes, canceladas = self._contar_instancias(nuevo)
+        self._contadores['instancias_vigentes'] += vigentes - vigentes_antes
+        self._contadores['instancias_canceladas'] += canceladas - canceladas_antes
+    
+    @staticmethod
+    def _contar_configuraciones(cat_elem):
+        if cat_elem is None:
+            return 0
+        return len(cat_elem.findall('listaConfiguraciones/configuracion'))
+    
+    @staticmethod
+    def _contar_instancias(cli_elem):
+        """Devuelve (vigentes, canceladas) de un elemento <cliente>."""
+        if cli_elem is None:
+            return 0, 0
+        estados = [e.text for e in cli_elem.findall('listaInstancias/instancia/estado')]
+        return estados.count('Vigente'), estados.count('Cancelada')
+    
+    # ==================== ÍNDICE DE FECHAS ====================
+    
+    def facturas_en_rango(self, dia_inicio, dia_fin):
+        """
+        Números de las facturas emitidas en el rango [dia_inicio, dia_fin].
+        
+        Returns:
+            list: Números de factura ordenados por fecha
+        """
+        inicio, fin = self.rango_fechas(dia_inicio, dia_fin)
+        return [numero for _, numero in self._indice_fechas[inicio:fin]]
+    
+    def rango_fechas(self, dia_inicio, dia_fin):
+        """
+        Posiciones del índice de fechas que cubren [dia_inicio, dia_fin].
+        
+        Returns:
+            tuple: (inicio, fin) para recortar indice_fechas
+        """
+        inicio = bisect_left(self._indice_fechas, (dia_inicio,))
+        fin = bisect_right(self._indice_fechas, (dia_fin, float('inf')))
+        return inicio, fin
+    
+    # ==================== PENDIENTES DE FACTURAR ====================
+    
+    def registrar_pendientes_cliente(self, cli_elem):
+        """
+        Recalcula el saldo pendiente de un cliente a partir de su elemento
+        <cliente> (al guardarlo, p. ej. después de marcar consumos facturados).
+        """
+        instancias = {}
+        for inst_elem in cli_elem.findall('listaInstancias/instancia'):
+            consumos = 0
+            horas = 0.0
+            for consumo_elem in inst_elem.findall('listaConsumos/consumo'):
+                if consumo_elem.findtext('facturado') == 'True':
+                    continue
+                consumos += 1
+                horas += float(consumo_elem.find('tiempo').text)
+            
+            if consumos:
+                id_config = int(inst_elem.find('idConfiguracion').text)
+                instancias[int(inst_elem.get('id'))] = {
+                    'nombre': inst_elem.find('nombre').text,
+                    'id_configuracion': id_config,
+                    'consumos': consumos,
+                    'horas': horas,
+                    'monto': horas * self._costo_hora(id_config)
+                }
+        
+        self._pendientes[cli_elem.get('nit')] = {
+            'nombre': cli_elem.find('nombre').text,
+            'instancias': instancias
+        }
+    
+    def registrar_consumo(self, nit, inst_elem, consumo):
+        """Suma un consumo recién ingresado al saldo de su instancia."""
+        self._versiones['clientes'] += 1
+        if consumo.facturado or nit not in self._pendientes:
+            return
+        
+        id_instancia = int(inst_elem.get('id'))
+        id_config = int(inst_elem.find('idConfiguracion').text)
+        instancias = self._pendientes[nit]['instancias']
+        
+        pendiente = instancias.setdefault(id_instancia, {
+            'nombre': inst_elem.find('nombre').text,
+            'id_configuracion': id_config,
+            'consumos': 0,
+            'horas': 0.0,
+            'monto': 0.0
+        })
+        pendiente['consumos'] += 1
+        pendiente['horas'] += consumo.tiempo
+        pendiente['monto'] = pendiente['horas'] * self._costo_hora(id_config)
+    
+    def eliminar_pendientes_cliente(self, nit):
+        self._pendientes.pop(nit, None)
+    
+    def _revalorizar_pendientes(self):
+        """Recalcula los montos pendientes con los precios vigentes."""
+        for cliente in self._pendientes.values():
+            for pendiente in cliente['instancias'].values():
+                pendiente['monto'] = pendiente['horas'] * self._costo_hora(pendiente['id_configuracion'])
+    
+    def _costo_hora(self, id_config):
+        config = self._configuraciones.get(id_config)
+        return config['costo_hora'] if config else 0.0
+    
+    # ==================== ARCHIVOS APLICADOS ====================
+    
+    def archivo_aplicado(self, huella):
+        return huella in self._archivos_aplicados
+    
+    def registrar_archivo(self, huella, consumos):
+        """
+        Recuerda un archivo de consumos aplicado para ignorarlo si se reenvía.
+        
+        Args:
+            huella: SHA-256 del contenido del archivo
+            consumos: Cantidad de consumos que se guardaron de ese archivo
+        """
+        self._archivos_aplicados[huella] = {
+            'fecha': datetime.now().strftime('%d/%m/%Y %H:%M'),
+            'consumos': consumos
+        }
+    
+    def olvidar_archivo(self, huella):
+        """Permite volver a aplicar un archivo. Devuelve False si no estaba registrado."""
+        return self._archivos_aplicados.pop(huella, None) is not None
+    
+    # ==================== CATÁLOGO ====================
+    
+    def actualizar_catalogo(self, root):
+        """
+        Recalcula el catálogo de configuraciones desde los nodos de recursos
+        y categorías, y revaloriza los saldos pendientes con los nuevos precios.
+        """
+        precios = {
+            int(rec_elem.get('id')): float(rec_elem.find('valorXhora').text)
+            for rec_elem in root.find('recursos').findall('recurso')
+        }
+        
+        self._configuraciones = {}
+        for cat_elem in root.find('categorias').findall('categoria'):
+            configs_elem = cat_elem.find('listaConfiguraciones')
+            if configs_elem is None:
+                continue
+            for config_elem in configs_elem.findall('configuracion'):
+                costo_hora = 0.0
+                for rec_elem in config_elem.findall('recursosConfiguracion/recurso'):
+                    id_recurso = int(rec_elem.get('id'))
+                    if id_recurso in precios:
+                        costo_hora += precios[id_recurso] * float(rec_elem.text)
+                
+                self._configuraciones[int(config_elem.get('id'))] = {
+                    'categoria_id': int(cat_elem.get('id')),
+                    'categoria_nombre': cat_elem.find('nombre').text,
+                    'configuracion_nombre': config_elem.find('nombre').text,
+                    'costo_hora': costo_hora
+                }
+        
+        self._revalorizar_pendientes()
+    
+    # ==================== XML ====================
+    
+    def to_xml_element(self):
+        meta_elem = ET.Element('metadatos')
+        
+        ventas_elem = ET.SubElement(meta_elem, 'ventasDiarias')
+        for dia in self._dias:
+            dia_elem = ET.SubElement(ventas_elem, 'dia', ordinal=str(dia), fecha=dia_a_fecha(dia))
+            for id_config, valores in self._ventas_configuracion[dia].items():
+                ET.SubElement(dia_elem, 'configuracion', id=str(id_config),
+                              **{campo: str(valor) for campo, valor in valores.items()})
+            for nombre, valores in self._ventas_recurso[dia].items():
+                ET.SubElement(dia_elem, 'recurso', nombre=nombre,
+                              **{campo: str(valor) for campo, valor in valores.items()})
+        
+        indice_elem = ET.SubElement(meta_elem, 'indiceFechas')
+        for dia, numero in self._indice_fechas:
+            ET.SubElement(indice_elem, 'factura', dia=str(dia), numero=str(numero))
+        
+        ET.SubElement(meta_elem, 'contadores', **{
+            campo: str(valor) for campo, valor in self._contadores.items() if valor is not None
+        })
+        facturados_elem = ET.SubElement(meta_elem, 'clientesFacturados')
+        for nit in sorted(self._clientes_facturados):
+            ET.SubElement(facturados_elem, 'nit').text = nit
+        
+        pendientes_elem = ET.SubElement(meta_elem, 'pendientes')
+        for nit, cliente in self._pendientes.items():
+            cli_elem = ET.SubElement(pendientes_elem, 'cliente', nit=nit, nombre=cliente['nombre'])
+            for id_instancia, pendiente in cliente['instancias'].items():
+                ET.SubElement(
+                    cli_elem, 'instancia',
+                    id=str(id_instancia),
+                    idConfiguracion=str(pendiente['id_configuracion']),
+                    nombre=pendiente['nombre'],
+                    consumos=str(pendiente['consumos']),
+                    horas=str(pendiente['horas']),
+                    monto=str(pendiente['monto'])
+                )
+        
+        aplicados_elem = ET.SubElement(meta_elem, 'archivosAplicados')
+        for huella, archivo in self._archivos_aplicados.items():
+            ET.SubElement(aplicados_elem, 'archivo', sha256=huella,
+                          fecha=archivo['fecha'], consumos=str(archivo['consumos']))
+        
+        ET.SubElement(meta_elem, 'versiones', epoca=self._epoca, **{
+            coleccion: str(version) for coleccion, version in self._versiones.items()
+        })
+        
+        return meta_elem
+    
+    @staticmethod
+    def from_root(root):
+        """
+        Carga los metadatos de data.xml. Las secciones que falten se
+        reconstruyen a partir de los datos.
+        """
+        metadatos = Metadatos()
+        meta_elem = root.find('metadatos')
+        if meta_elem is None:
+            meta_elem = ET.Element('metadatos')
+        
+        lista_facturas = root.find('facturas').findall('factura')
+        
+        ventas_elem = meta_elem.find('ventasDiarias')
+        if ventas_elem is not None:
+            metadatos._cargar_ventas(ventas_elem)
+        else:
+            for fac_elem in lista_facturas:
+                factura = Factura.from_xml_element(fac_elem)
+                dia = fecha_a_dia(factura.fecha)
+                if dia is not None:
+                    metadatos._registrar_ventas(dia, factura)
+        
+        indice_elem = meta_elem.find('indiceFechas')
+        if indice_elem is not None:
+            metadatos._indice_fechas = sorted(
+                (int(e.get('dia')), int(e.get('numero'))) for e in indice_elem.findall('factura')
+            )
+        else:
+            for fac_elem in lista_facturas:
+                dia = fecha_a_dia(fac_elem.find('fecha').text)
+                if dia is not None:
+                    metadatos._indice_fechas.append((dia, int(fac_elem.get('numero'))))
+            metadatos._indice_fechas.sort()
+        
+        contadores_elem = meta_elem.find('contadores')
+        facturados_elem = meta_elem.find('clientesFacturados')
+        if contadores_elem is not None and facturados_elem is not None:
+            for campo, valor in contadores_elem.attrib.items():
+                if campo in CONTADORES_DECIMALES:
+                    metadatos._contadores[campo] = float(valor)
+                elif campo in metadatos._contadores:
+                    metadatos._contadores[campo] = int(valor)
+            metadatos._clientes_facturados = {e.text for e in facturados_elem.findall('nit')}
+        else:
+            metadatos._contar_datos(root, lista_facturas)
+        
+        metadatos.actualizar_catalogo(root)
+        
+        # El saldo se reconstruye después del catálogo porque necesita los precios
+        pendientes_elem = meta_elem.find('pendientes')
+        if pendientes_elem is not None:
+            metadatos._cargar_pendientes(pendientes_elem)
+        else:
+            for cli_elem in root.find('clientes').findall('cliente'):
+                metadatos.registrar_pendientes_cliente(cli_elem)
+        
+        # El historial de archivos no se puede reconstruir: si falta empieza vacío
+        aplicados_elem = meta_elem.find('archivosAplicados')
+        if aplicados_elem is not None:
+            metadatos._archivos_aplicados = {
+                e.get('sha256'): {'fecha': e.get('fecha'), 'consumos': int(e.get('consumos'))}
+                for e in aplicados_elem.findall('archivo')
+            }
+        
+        # Sin versiones guardadas se empieza una época nueva, así ningún ETag
+        # emitido antes puede coincidir. Se cargan al final porque reconstruir
+        # los contadores también las incrementa.
+        versiones_elem = meta_elem.find('versiones')
+        if versiones_elem is not None:
+            metadatos._epoca = versiones_elem.get('epoca')
+            metadatos._versiones = {
+                coleccion: int(versiones_elem.get(coleccion, '0')) for coleccion in COLECCIONES
+            }
+        
+        return metadatos
+    
+    def _cargar_pendientes(self, pendientes_elem):
+        for cli_elem in pendientes_elem.findall('cliente'):
+            self._pendientes[cli_elem.get('nit')] = {
+                'nombre': cli_elem.get('nombre'),
+                'instancias': {
+                    int(e.get('id')): {
+                        'nombre': e.get('nombre'),
+                        'id_configuracion': int(e.get('idConfiguracion')),
+                        'consumos': int(e.get('consumos')),
+                        'horas': float(e.get('horas')),
+                        'monto': float(e.get('monto'))
+                    }
+                    for e in cli_elem.findall('instancia')
+                }
+            }
+    
+    def _contar_datos(self, root, lista_facturas):
+        """Reconstruye los contadores recorriendo los datos."""
+        for rec_elem in root.find('recursos').findall('recurso'):
+            self.registrar_recurso(None, rec_elem)
+        for cat_elem in root.find('categorias').findall('categoria'):
+            self.registrar_categoria(None, cat_elem)
+        for cli_elem in root.find('clientes').findall('cliente'):
+            self.registrar_cliente(None, cli_elem)
+        for fac_elem in lista_facturas:
+            self._contar_factura(
+                int(fac_elem.get('numero')),
+                fac_elem.find('nitCliente').text,
+                float(fac_elem.find('montoTotal').text)
+            )
+    
+    def _cargar_ventas(self, ventas_elem):
+        for dia_elem in ventas_elem.findall('dia'):
+            dia = int(dia_elem.get('ordinal'))
+            self._dias.append(dia)
+            self._ventas_configuracion[dia] = {
+                int(e.get('id')): {
+                    'ingresos': float(e.get('ingresos')),
+                    'horas': float(e.get('horas')),
+                    'instancias': int(e.get('instancias'))
+                }
+                for e in dia_elem.findall('configuracion')
+            }
+            self._ventas_recurso[dia] = {
+                e.get('nombre'): {
+                    'ingresos': float(e.get('ingresos')),
+                    'horas': float(e.get('horas')),
+                    'cantidad': float(e.get('cantidad')),
+                    'instancias': int(e.get('instancias'))
+                }
+                for e in dia_elem.findall('recurso')
+            }
+        self._dias.sort()
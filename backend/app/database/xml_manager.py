@@ -1,57 +1,609 @@
 import xml.etree.ElementTree as ET
+import copy
+import functools
 import os
+import shutil
+import threading
+import time
+import uuid
 from app.models import Recurso, Categoria, Cliente, Factura
+from app.database.metadatos import Metadatos, fecha_a_dia
+from app.utils.metricas import metricas
+from app.utils.paginacion import paginar, paginar_indice
+
+# Versión del esquema de data.xml; se guarda como atributo del nodo raíz
+ESQUEMA_VERSION = 2
+
+# Metadatos ya cargados por archivo: {ruta: (firma, Metadatos)}.
+# Se comparten entre todas las instancias de XMLManager del proceso y no
+# se modifican: cada escritura trabaja sobre una copia y la publica al
+# terminar de reemplazar el archivo.
+_cache_metadatos = {}
+
+# Serializa las escrituras del proceso (leer, modificar y reemplazar data.xml);
+# sin él dos peticiones simultáneas parten del mismo archivo y una pierde sus cambios
+_lock_escritura = threading.RLock()
+
+
+def _escritura(metodo):
+    """Ejecuta el método de XMLManager con el lock de escritura tomado."""
+    @functools.wraps(metodo)
+    def envoltura(*args, **kwargs):
+        with _lock_escritura:
+            return metodo(*args, **kwargs)
+    return envoltura
+
+
+def _entero(atributo):
+    return lambda elem: int(elem.get(atributo))
+
+
+def _texto(etiqueta):
+    return lambda elem: elem.findtext(etiqueta) or ''
+
+
+def _decimal(etiqueta):
+    return lambda elem: float(elem.findtext(etiqueta) or 0)
+
+
+# Colecciones paginables: (etiqueta, clave primaria, {campo de orden: valor desde el elemento})
+_PAGINABLES = {
+    'recursos': ('recurso', 'id', {
+        'id': _entero('id'),
+        'nombre': _texto('nombre'),
+        'tipo': _texto('tipo'),
+        'valor_x_hora': _decimal('valorXhora')
+    }),
+    'categorias': ('categoria', 'id', {
+        'id': _entero('id'),
+        'nombre': _texto('nombre')
+    }),
+    'clientes': ('cliente', 'nit', {
+        'nit': lambda elem: elem.get('nit'),
+        'nombre': _texto('nombre')
+    }),
+    'facturas': ('factura', 'numero', {
+        'numero': _entero('numero'),
+        'fecha': lambda elem: fecha_a_dia(elem.findtext('fecha')) or 0,
+        'monto_total': _decimal('montoTotal'),
+        'nit_cliente': _texto('nitCliente')
+    })
+}
+
+def _clave_consumo(consumo_elem):
+    """Identifica un <consumo> dentro de su instancia: (fecha y hora, tiempo)."""
+    return consumo_elem.findtext('fechaHora') or None, float(consumo_elem.findtext('tiempo'))
+
+
+CAMPOS_ORDEN = {coleccion: tuple(campos) for coleccion, (_, _, campos) in _PAGINABLES.items()}
+
 
 class XMLManager:
     """Maneja la persistencia en XML (base de datos)."""
     
     def __init__(self, archivo='app/database/data.xml'):
         self.archivo = archivo
-        self._init_database()
+        with _lock_escritura:
+            self._init_database()
+            self._migrar()
     
     def _init_database(self):
         """Crea el archivo XML si no existe."""
         if not os.path.exists(self.archivo):
             os.makedirs(os.path.dirname(self.archivo), exist_ok=True)
-            root = ET.Element('database')
+            root = ET.Element('database', esquema=str(ESQUEMA_VERSION))
             ET.SubElement(root, 'recursos')
             ET.SubElement(root, 'categorias')
             ET.SubElement(root, 'clientes')
             ET.SubElement(root, 'facturas')
+            # Con los metadatos desde el inicio la época de versiones queda fija
+            root.append(Metadatos().to_xml_element())
             
             tree = ET.ElementTree(root)
             ET.indent(tree, space="  ")
             tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
     
+    def _migrar(self):
+        """Aplica una sola vez las migraciones pendientes según el esquema."""
+        tree = self._parsear()
+        root = tree.getroot()
+        
+        esquema = int(root.get('esquema', '1'))
+        if esquema >= ESQUEMA_VERSION:
+            return
+        
+        if esquema < 2:
+            self._migrar_detalles_factura(root)
+        
+        root.set('esquema', str(ESQUEMA_VERSION))
+        ET.indent(tree, space="  ")
+        tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+    
+    def _migrar_detalles_factura(self, root):
+        """
+        Completa idConfiguracion e idCategoria en los detalles de facturas
+        generadas antes de que se registraran al facturar.
+        """
+        config_por_instancia = {}
+        for cli_elem in root.find('clientes').findall('cliente'):
+            instancias_elem = cli_elem.find('listaInstancias')
+            if instancias_elem is None:
+                continue
+            for inst_elem in instancias_elem.findall('instancia'):
+                clave = (cli_elem.get('nit'), int(inst_elem.get('id')))
+                config_por_instancia[clave] = int(inst_elem.find('idConfiguracion').text)
+        
+        categoria_por_config = {}
+        for cat_elem in root.find('categorias').findall('categoria'):
+            configs_elem = cat_elem.find('listaConfiguraciones')
+            if configs_elem is None:
+                continue
+            for config_elem in configs_elem.findall('configuracion'):
+                categoria_por_config[int(config_elem.get('id'))] = int(cat_elem.get('id'))
+        
+        for fac_elem in root.find('facturas').findall('factura'):
+            nit = fac_elem.find('nitCliente').text
+            detalles_elem = fac_elem.find('detalles')
+            if detalles_elem is None:
+                continue
+            
+            for det_elem in detalles_elem.findall('detalle'):
+                if det_elem.find('idConfiguracion') is not None:
+                    continue
+                
+                id_config = config_por_instancia.get((nit, int(det_elem.find('idInstancia').text)))
+                if id_config is None:
+                    continue
+                
+                ET.SubElement(det_elem, 'idConfiguracion').text = str(id_config)
+                if id_config in categoria_por_config:
+                    ET.SubElement(det_elem, 'idCategoria').text = str(categoria_por_config[id_config])
+    
+    # ==================== METADATOS ====================
+    
+    def _firma(self):
+        """Identifica la versión actual del archivo sin leerlo."""
+        stat = os.stat(self.archivo)
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _metadatos(self, root=None):
+        """
+        Obtiene los metadatos vigentes. Si el archivo no cambió desde la
+        última lectura o escritura se devuelven los que están en memoria.
+        
+        Args:
+            root: Nodo raíz ya parseado (evita volver a leer el archivo)
+        """
+        ruta = os.path.abspath(self.archivo)
+        firma = self._firma()
+        
+        en_cache = _cache_metadatos.get(ruta)
+        if en_cache and en_cache[0] == firma:
+            return en_cache[1]
+        
+        if root is None:
+            root = self._parsear().getroot()
+        
+        metadatos = Metadatos.from_root(root)
+        _cache_metadatos[ruta] = (firma, metadatos)
+        return metadatos
+    
+    def _parsear(self):
+        """Parsea data.xml completo registrando la duración y los bytes leídos."""
+        inicio = time.perf_counter()
+        with open(self.archivo, 'rb') as archivo:
+            tree = ET.parse(archivo)
+            leidos = archivo.tell()
+        
+        metricas.observar('xml_parseo_segundos', time.perf_counter() - inicio)
+        metricas.incrementar('xml_bytes_leidos_total', leidos, modo='completo')
+        return tree
+    
+    def _cargar(self):
+        """
+        Parsea data.xml y devuelve el árbol junto con una copia de sus
+        metadatos, que el llamador puede modificar antes de _escribir.
+        Solo se usa con el lock de escritura tomado.
+        """
+        tree = self._parsear()
+        return tree, copy.deepcopy(self._metadatos(tree.getroot()))
+    
+    def _escribir(self, tree, metadatos):
+        """Escribe el árbol con sus metadatos actualizados."""
+        ruta = os.path.abspath(self.archivo)
+        root = tree.getroot()
+        
+        meta_elem = root.find('metadatos')
+        if meta_elem is not None:
+            root.remove(meta_elem)
+        root.append(metadatos.to_xml_element())
+        
+        # Se escribe a un temporal y se reemplaza el archivo, así una lectura en
+        # curso (p. ej. un listado en streaming) sigue viendo la versión anterior.
+        # El nombre es único por escritura: los hilos de un mismo proceso no se pisan
+        temporal = f'{ruta}.{uuid.uuid4().hex}.tmp'
+        try:
+            # La serialización va a un buffer de 1 MiB; el vaciado final y el
+            # reemplazo se miden como escritura
+            inicio = time.perf_counter()
+            with open(temporal, 'w', encoding='utf-8', errors='xmlcharrefreplace',
+                      buffering=1024 * 1024) as archivo:
+                ET.indent(tree, space="  ")
+                archivo.write("<?xml version='1.0' encoding='utf-8'?>\n")
+                tree.write(archivo, encoding='unicode')
+                serializacion = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+            escritos = os.path.getsize(temporal)
+            self._reemplazar(temporal, ruta)
+            escritura = time.perf_counter() - inicio
+        finally:
+            # Tras un reemplazo exitoso el temporal ya no existe
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        
+        # Los metadatos modificados se publican solo con el archivo ya reemplazado
+        _cache_metadatos[ruta] = (self._firma(), metadatos)
+        
+        metricas.observar('xml_serializacion_segundos', serializacion)
+        metricas.observar('xml_escritura_segundos', escritura)
+        metricas.incrementar('xml_bytes_escritos_total', escritos)
+    
+    @staticmethod
+    def _reemplazar(origen, destino, intentos=40):
+        """
+        Reemplaza destino por origen. En Windows no se puede reemplazar un
+        archivo abierto por otra lectura, así que se reintenta un momento.
+        """
+        for intento in range(intentos):
+            try:
+                os.replace(origen, destino)
+                return
+            except PermissionError:
+                if intento == intentos - 1:
+                    raise
+                time.sleep(0.05)
+    
+    @_escritura
     def limpiar_database(self):
         """Elimina todos los datos (Inicializar Sistema)."""
         if os.path.exists(self.archivo):
             os.remove(self.archivo)
         self._init_database()
     
+    # ==================== CARGA MASIVA ====================
+    
+    @_escritura
+    def guardar_lote(self, recursos=(), categorias=(), clientes=(), solo_nuevos=False):
+        """
+        Inserta o actualiza recursos, categorías y clientes en una sola
+        lectura y una sola escritura del XML.
+        
+        Las instancias de un cliente que ya existía conservan sus consumos
+        cuando la versión nueva no trae ninguno.
+        
+        Args:
+            recursos (list): Recursos a guardar
+            categorias (list): Categorías a guardar
+            clientes (list): Clientes a guardar
+            solo_nuevos (bool): No tocar los que ya existen y devolver sus claves
+            
+        Returns:
+            dict: Cantidad de objetos insertados, actualizados y sin cambios;
+                  con solo_nuevos también 'existentes': {colección: [claves]}
+        """
+        tree, metadatos = self._cargar()
+        root = tree.getroot()
+        
+        conteo = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+        if solo_nuevos:
+            conteo['existentes'] = {'recursos': [], 'categorias': [], 'clientes': []}
+        
+        def registrar_cliente(anterior, nuevo):
+            metadatos.registrar_cliente(anterior, nuevo)
+            metadatos.registrar_pendientes_cliente(nuevo)
+        
+        colecciones = [
+            ('recursos', 'id', recursos, metadatos.registrar_recurso),
+            ('categorias', 'id', categorias, metadatos.registrar_categoria),
+            ('clientes', 'nit', clientes, registrar_cliente)
+        ]
+        
+        for nombre_nodo, clave, objetos, registrar in colecciones:
+            nodo = root.find(nombre_nodo)
+            posiciones = {elem.get(clave): i for i, elem in enumerate(nodo)}
+            
+            for objeto in objetos:
+                nuevo = objeto.to_xml_element()
+                id_objeto = nuevo.get(clave)
+                
+                if id_objeto not in posiciones:
+                    posiciones[id_objeto] = len(nodo)
+                    nodo.append(nuevo)
+                    registrar(None, nuevo)
+                    conteo['insertados'] += 1
+                    continue
+                
+                if solo_nuevos:
+                    conteo['existentes'][nombre_nodo].append(id_objeto)
+                    continue
+                
+                anterior = nodo[posiciones[id_objeto]]
+                if nombre_nodo == 'clientes':
+                    self._fusionar_consumos(anterior, nuevo)
+                
+                if self._elementos_iguales(anterior, nuevo):
+                    conteo['sin_cambios'] += 1
+                    continue
+                
+                nodo[posiciones[id_objeto]] = nuevo
+                registrar(anterior, nuevo)
+                conteo['actualizados'] += 1
+        
+        if conteo['insertados'] or conteo['actualizados']:
+            metadatos.actualizar_catalogo(root)
+            self._escribir(tree, metadatos)
+        
+        return conteo
+    
+    @staticmethod
+    def _fusionar_consumos(cli_anterior, cli_nuevo):
+        """
+        Completa el cliente que se va a guardar con los consumos ya guardados.
+        
+        El cliente nuevo casi siempre se leyó antes de tomar el lock (se lee,
+        se modifica y se guarda), así que le pueden faltar consumos ingresados
+        mientras tanto: se agregan al final de su instancia. Un consumo que ya
+        está guardado como facturado sigue facturado aunque la copia diga lo
+        contrario, para no volver a facturarlo.
+        """
+        consumos_anteriores = {
+            inst_elem.get('id'): inst_elem.find('listaConsumos')
+            for inst_elem in cli_anterior.findall('listaInstancias/instancia')
+        }
+        
+        for inst_elem in cli_nuevo.findall('listaInstancias/instancia'):
+            anteriores = consumos_anteriores.get(inst_elem.get('id'))
+            if anteriores is None or len(anteriores) == 0:
+                continue
+            
+            nuevos = inst_elem.find('listaConsumos')
+            if nuevos is None:
+                nuevos = ET.SubElement(inst_elem, 'listaConsumos')
+            presentes = {_clave_consumo(consumo_elem): consumo_elem for consumo_elem in nuevos}
+            
+            for consumo_elem in anteriores:
+                presente = presentes.get(_clave_consumo(consumo_elem))
+                if presente is None:
+                    nuevos.append(consumo_elem)
+                elif consumo_elem.findtext('facturado') == 'True':
+                    presente.find('facturado').text = 'True'
+    
+    @staticmethod
+    def _elementos_iguales(a, b):
+        """Compara dos elementos ignorando los espacios de la indentación."""
+        if a.tag != b.tag or a.attrib != b.attrib:
+            return False
+        if (a.text or '').strip() != (b.text or '').strip():
+            return False
+        if len(a) != len(b):
+            return False
+        return all(XMLManager._elementos_iguales(x, y) for x, y in zip(a, b))
+    
+    # ==================== LECTURA EN STREAMING ====================
+    
+    def _iterar_elementos(self, coleccion, etiqueta, instantanea=True):
+        """
+        Recorre con iterparse los elementos `etiqueta` del nodo `coleccion`
+        sin cargar el archivo completo. Cada elemento se descarta después de
+        entregarlo, igual que los de las demás colecciones que se atraviesan.
+        
+        Args:
+            coleccion (str): Nodo que contiene los elementos
+            etiqueta (str): Etiqueta de los elementos a entregar
+            instantanea (bool): Recorrer una copia de data.xml tomada con el
+                lock de escritura. Un recorrido largo (p. ej. un listado NDJSON
+                hacia un cliente lento) no deja abierto data.xml, que en Windows
+                impediría reemplazarlo al escribir. Las lecturas cortas pueden
+                omitirla; _reemplazar ya reintenta mientras terminan.
+        """
+        origen = self.archivo
+        if instantanea:
+            origen = f'{os.path.abspath(self.archivo)}.{uuid.uuid4().hex}.lectura.tmp'
+        
+        try:
+            if instantanea:
+                with _lock_escritura:
+                    shutil.copyfile(self.archivo, origen)
+            
+            with open(origen, 'rb') as archivo:
+                pila = []
+                try:
+                    for evento, elem in ET.iterparse(archivo, events=('start', 'end')):
+                        if evento == 'start':
+                            pila.append(elem)
+                            continue
+                        
+                        pila.pop()
+                        if len(pila) == 2:
+                            if pila[1].tag == coleccion and elem.tag == etiqueta:
+                                yield elem
+                            pila[1].remove(elem)
+                        elif len(pila) == 1 and elem.tag == coleccion:
+                            return
+                finally:
+                    metricas.incrementar('xml_bytes_leidos_total', archivo.tell(), modo='streaming')
+        finally:
+            if instantanea and os.path.exists(origen):
+                os.remove(origen)
+    
+    def iterar_recursos(self):
+        """Recorre los recursos uno por uno."""
+        for elem in self._iterar_elementos('recursos', 'recurso'):
+            yield Recurso.from_xml_element(elem)
+    
+    def iterar_categorias(self):
+        """Recorre las categorías con sus configuraciones una por una."""
+        for elem in self._iterar_elementos('categorias', 'categoria'):
+            yield Categoria.from_xml_element(elem)
+    
+    def iterar_clientes(self):
+        """Recorre los clientes con sus instancias uno por uno."""
+        import app.utils.regex_utils as utils
+        
+        for elem in self._iterar_elementos('clientes', 'cliente'):
+            yield Cliente.from_xml_element(elem, utils)
+    
+    def iterar_facturas(self, nit_cliente=None, fecha_inicio=None, fecha_fin=None):
+        """
+        Recorre las facturas una por una en el orden del archivo.
+        
+        Args:
+            nit_cliente (str, optional): Solo las facturas de este cliente
+            fecha_inicio (str, optional): Desde esta fecha (dd/mm/yyyy), junto con fecha_fin
+            fecha_fin (str, optional): Hasta esta fecha (dd/mm/yyyy)
+        """
+        numeros = None
+        if fecha_inicio and fecha_fin:
+            numeros = set(self._metadatos().facturas_en_rango(
+                fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin)
+            ))
+            if not numeros:
+                return
+        
+        for elem in self._iterar_elementos('facturas', 'factura'):
+            if nit_cliente and elem.findtext('nitCliente') != nit_cliente:
+                continue
+            if numeros is not None and int(elem.get('numero')) not in numeros:
+                continue
+            yield Factura.from_xml_element(elem)
+    
+    def exportar_todo_a_xml(self):
+        """
+        Exporta recursos, categorías, clientes y facturas como texto XML
+        (sin los metadatos internos).
+        """
+        root = self._parsear().getroot()
+        meta_elem = root.find('metadatos')
+        if meta_elem is not None:
+            root.remove(meta_elem)
+        return ET.tostring(root, encoding='unicode')
+    
+    # ==================== LISTADOS PAGINADOS ====================
+    
+    def obtener_pagina(self, coleccion, paginacion, nit_cliente=None, fecha_inicio=None, fecha_fin=None):
+        """
+        Obtiene una página de recursos, categorías, clientes o facturas.
+        
+        El orden y el corte se hacen sobre claves leídas de los elementos;
+        solo los elementos de la página se convierten en objetos. Las
+        facturas ordenadas por fecha se paginan sobre el índice de fechas
+        de los metadatos, sin parsear el archivo completo.
+        
+        Args:
+            coleccion (str): 'recursos', 'categorias', 'clientes' o 'facturas'
+            paginacion (Paginacion): Orden, límite y cursor u offset
+            nit_cliente (str, optional): Filtra facturas por cliente
+            fecha_inicio (str, optional): Filtra facturas desde esta fecha (dd/mm/yyyy)
+            fecha_fin (str, optional): Filtra facturas hasta esta fecha (dd/mm/yyyy)
+            
+        Returns:
+            tuple: (objetos de la página, total de elementos, siguiente cursor o None)
+        """
+        etiqueta, clave_primaria, campos = _PAGINABLES[coleccion]
+        
+        if coleccion == 'facturas' and paginacion.activa and paginacion.orden == 'fecha' and not nit_cliente:
+            metadatos = self._metadatos()
+            # Las facturas con fecha inválida no están en el índice
+            if len(metadatos.indice_fechas) == metadatos.contadores['facturas']:
+                return self._pagina_facturas_por_fecha(metadatos, paginacion, fecha_inicio, fecha_fin)
+        
+        numeros = None
+        if fecha_inicio and fecha_fin:
+            numeros = set(self._metadatos().facturas_en_rango(
+                fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin)
+            ))
+            if not numeros:
+                return [], 0, None
+        
+        root = self._parsear().getroot()
+        primaria = campos[clave_primaria]
+        valor_orden = campos[paginacion.orden]
+        
+        entradas = []
+        for elem in root.find(coleccion).findall(etiqueta):
+            if nit_cliente and elem.findtext('nitCliente') != nit_cliente:
+                continue
+            if numeros is not None and int(elem.get('numero')) not in numeros:
+                continue
+            entradas.append(((valor_orden(elem), primaria(elem)), elem))
+        
+        elementos, total, siguiente = paginar(entradas, paginacion)
+        return [self._desde_elemento(coleccion, elem) for elem in elementos], total, siguiente
+    
+    def _pagina_facturas_por_fecha(self, metadatos, paginacion, fecha_inicio=None, fecha_fin=None):
+        """
+        Página de facturas ordenadas por fecha tomada del índice (dia, numero),
+        que ya está en el orden de la clave de paginación. Del archivo solo se
+        construyen las facturas de la página, recorriéndolo en streaming.
+        """
+        inicio, fin = 0, None
+        if fecha_inicio and fecha_fin:
+            inicio, fin = metadatos.rango_fechas(fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin))
+        
+        claves, total, siguiente = paginar_indice(metadatos.indice_fechas, paginacion, inicio, fin)
+        
+        buscados = {numero for _, numero in claves}
+        encontradas = {}
+        if buscados:
+            # Lectura corta: se detiene al encontrar las facturas de la página
+            for elem in self._iterar_elementos('facturas', 'factura', instantanea=False):
+                numero = int(elem.get('numero'))
+                if numero in buscados:
+                    encontradas[numero] = Factura.from_xml_element(elem)
+                    if len(encontradas) == len(buscados):
+                        break
+        
+        return [encontradas[numero] for _, numero in claves if numero in encontradas], total, siguiente
+    
+    @staticmethod
+    def _desde_elemento(coleccion, elem):
+        if coleccion == 'recursos':
+            return Recurso.from_xml_element(elem)
+        if coleccion == 'categorias':
+            return Categoria.from_xml_element(elem)
+        if coleccion == 'clientes':
+            import app.utils.regex_utils as utils
+            return Cliente.from_xml_element(elem, utils)
+        return Factura.from_xml_element(elem)
+    
     # ==================== RECURSOS ====================
     
+    @_escritura
     def guardar_recurso(self, recurso):
         """Guarda un recurso en el XML."""
-        tree = ET.parse(self.archivo)
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         recursos_node = root.find('recursos')
         
         # Verificar si ya existe
+        anterior = None
         for rec_elem in recursos_node.findall('recurso'):
             if int(rec_elem.get('id')) == recurso.id:
+                anterior = rec_elem
                 recursos_node.remove(rec_elem)
                 break
         
-        recursos_node.append(recurso.to_xml_element())
+        nuevo = recurso.to_xml_element()
+        recursos_node.append(nuevo)
+        metadatos.registrar_recurso(anterior, nuevo)
+        metadatos.actualizar_catalogo(root)
         
-        ET.indent(tree, space="  ")
-        tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+        self._escribir(tree, metadatos)
     
     def obtener_recursos(self):
         """Obtiene todos los recursos del XML."""
-        tree = ET.parse(self.archivo)
+        tree = self._parsear()
         root = tree.getroot()
         
         recursos = []
@@ -71,9 +623,10 @@ class XMLManager:
                 return recurso
         return None
     
+    @_escritura
     def eliminar_recurso(self, id_recurso):
         """Elimina un recurso del XML."""
-        tree = ET.parse(self.archivo)
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         recursos_node = root.find('recursos')
@@ -81,35 +634,41 @@ class XMLManager:
         for rec_elem in recursos_node.findall('recurso'):
             if int(rec_elem.get('id')) == int(id_recurso):
                 recursos_node.remove(rec_elem)
-                ET.indent(tree, space="  ")
-                tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+                metadatos.registrar_recurso(rec_elem, None)
+                metadatos.actualizar_catalogo(root)
+                self._escribir(tree, metadatos)
                 return True
         
         return False
     
     # ==================== CATEGORÍAS ====================
     
+    @_escritura
     def guardar_categoria(self, categoria):
         """Guarda una categoría con sus configuraciones."""
-        tree = ET.parse(self.archivo)
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         categorias_node = root.find('categorias')
         
         # Verificar si ya existe
+        anterior = None
         for cat_elem in categorias_node.findall('categoria'):
             if int(cat_elem.get('id')) == categoria.id:
+                anterior = cat_elem
                 categorias_node.remove(cat_elem)
                 break
         
-        categorias_node.append(categoria.to_xml_element())
+        nuevo = categoria.to_xml_element()
+        categorias_node.append(nuevo)
+        metadatos.registrar_categoria(anterior, nuevo)
+        metadatos.actualizar_catalogo(root)
         
-        ET.indent(tree, space="  ")
-        tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+        self._escribir(tree, metadatos)
     
     def obtener_categorias(self):
         """Obtiene todas las categorías con sus configuraciones."""
-        tree = ET.parse(self.archivo)
+        tree = self._parsear()
         root = tree.getroot()
         
         categorias = []
@@ -138,9 +697,10 @@ class XMLManager:
                     return config
         return None
     
+    @_escritura
     def eliminar_categoria(self, id_categoria):
         """Elimina una categoría del XML."""
-        tree = ET.parse(self.archivo)
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         categorias_node = root.find('categorias')
@@ -148,37 +708,45 @@ class XMLManager:
         for cat_elem in categorias_node.findall('categoria'):
             if int(cat_elem.get('id')) == int(id_categoria):
                 categorias_node.remove(cat_elem)
-                ET.indent(tree, space="  ")
-                tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+                metadatos.registrar_categoria(cat_elem, None)
+                metadatos.actualizar_catalogo(root)
+                self._escribir(tree, metadatos)
                 return True
         
         return False
     
     # ==================== CLIENTES ====================
     
+    @_escritura
     def guardar_cliente(self, cliente):
         """Guarda un cliente con sus instancias."""
-        tree = ET.parse(self.archivo)
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         clientes_node = root.find('clientes')
         
         # Verificar si ya existe
+        anterior = None
         for cli_elem in clientes_node.findall('cliente'):
             if cli_elem.get('nit') == cliente.nit:
+                anterior = cli_elem
                 clientes_node.remove(cli_elem)
                 break
         
-        clientes_node.append(cliente.to_xml_element())
+        nuevo = cliente.to_xml_element()
+        if anterior is not None:
+            self._fusionar_consumos(anterior, nuevo)
+        clientes_node.append(nuevo)
+        metadatos.registrar_cliente(anterior, nuevo)
+        metadatos.registrar_pendientes_cliente(nuevo)
         
-        ET.indent(tree, space="  ")
-        tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+        self._escribir(tree, metadatos)
     
     def obtener_clientes(self):
         """Obtiene todos los clientes con sus instancias."""
         import app.utils.regex_utils as utils
         
-        tree = ET.parse(self.archivo)
+        tree = self._parsear()
         root = tree.getroot()
         
         clientes = []
@@ -198,9 +766,10 @@ class XMLManager:
                 return cliente
         return None
     
+    @_escritura
     def eliminar_cliente(self, nit):
         """Elimina un cliente del XML."""
-        tree = ET.parse(self.archivo)
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         clientes_node = root.find('clientes')
@@ -208,28 +777,154 @@ class XMLManager:
         for cli_elem in clientes_node.findall('cliente'):
             if cli_elem.get('nit') == nit:
                 clientes_node.remove(cli_elem)
-                ET.indent(tree, space="  ")
-                tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+                metadatos.registrar_cliente(cli_elem, None)
+                metadatos.eliminar_pendientes_cliente(nit)
+                self._escribir(tree, metadatos)
                 return True
         
         return False
     
+    # ==================== CONSUMOS ====================
+    
+    def guardar_consumos(self, consumos, huella=None):
+        """
+        Agrega consumos a las instancias de los clientes en una sola escritura.
+        
+        Un consumo con el mismo (nit, instancia, fecha y hora, tiempo) que uno
+        ya guardado se descarta, y un archivo cuya huella ya se aplicó no se
+        vuelve a escribir, así reenviar un archivo no duplica el consumo.
+        
+        El iterable suele leer y parsear el stream de la petición, así que se
+        consume completo antes de tomar el lock de escritura: una subida lenta
+        no detiene las demás escrituras, solo la fusión y la escritura final.
+        
+        Args:
+            consumos: Iterable de tuplas (nit, id_instancia, Consumo)
+            huella: SHA-256 del archivo de origen, o función que lo devuelve
+                una vez leídos los consumos (opcional)
+            
+        Returns:
+            dict: Cantidad de consumos guardados, rechazados (instancia
+                inexistente) y duplicados, y si el archivo ya estaba aplicado
+        """
+        consumos = list(consumos)
+        if callable(huella):
+            huella = huella()
+        
+        return self._fusionar_lote_consumos(consumos, huella)
+    
+    @_escritura
+    def _fusionar_lote_consumos(self, consumos, huella):
+        """Agrega los consumos ya leídos al árbol y lo escribe (con el lock tomado)."""
+        tree, metadatos = self._cargar()
+        root = tree.getroot()
+        
+        instancias = {}
+        for cli_elem in root.find('clientes').findall('cliente'):
+            for inst_elem in cli_elem.findall('listaInstancias/instancia'):
+                instancias[(cli_elem.get('nit'), int(inst_elem.get('id')))] = inst_elem
+        
+        # Claves de los consumos existentes; se arman solo para las instancias que reciben consumos
+        claves_instancia = {}
+        
+        guardados = 0
+        rechazados = 0
+        duplicados = 0
+        
+        for nit, id_instancia, consumo in consumos:
+            clave_instancia = (nit, int(id_instancia))
+            inst_elem = instancias.get(clave_instancia)
+            if inst_elem is None:
+                rechazados += 1
+                continue
+            
+            consumos_elem = inst_elem.find('listaConsumos')
+            if consumos_elem is None:
+                consumos_elem = ET.SubElement(inst_elem, 'listaConsumos')
+            
+            claves = claves_instancia.get(clave_instancia)
+            if claves is None:
+                claves = claves_instancia[clave_instancia] = {
+                    _clave_consumo(e) for e in consumos_elem.findall('consumo')
+                }
+            
+            clave = (consumo.fecha_hora, consumo.tiempo)
+            if clave in claves:
+                duplicados += 1
+                continue
+            claves.add(clave)
+            
+            consumos_elem.append(consumo.to_xml_element())
+            metadatos.registrar_consumo(nit, inst_elem, consumo)
+            guardados += 1
+        
+        archivo_repetido = huella is not None and metadatos.archivo_aplicado(huella)
+        if archivo_repetido:
+            # El archivo ya se aplicó: se descarta lo agregado a la copia
+            duplicados += guardados
+            guardados = 0
+        elif huella is not None:
+            # Se registra aunque no haya consumos nuevos (p. ej. todos ya estaban
+            # guardados), así un reenvío se descarta sin volver a parsearlo
+            metadatos.registrar_archivo(huella, guardados)
+            self._escribir(tree, metadatos)
+        elif guardados:
+            self._escribir(tree, metadatos)
+        
+        return {
+            'consumos_guardados': guardados,
+            'consumos_rechazados': rechazados,
+            'consumos_duplicados': duplicados,
+            'archivo_repetido': archivo_repetido
+        }
+    
+    def archivo_aplicado(self, huella):
+        """Indica si ya se aplicó un archivo de consumos con esa huella SHA-256."""
+        return self._metadatos().archivo_aplicado(huella)
+    
+    def obtener_archivos_aplicados(self):
+        """
+        Returns:
+            dict: {huella: {fecha, consumos}} de los archivos de consumos aplicados
+        """
+        return {
+            huella: dict(archivo)
+            for huella, archivo in self._metadatos().archivos_aplicados.items()
+        }
+    
+    @_escritura
+    def olvidar_archivo(self, huella):
+        """
+        Borra la huella de un archivo aplicado para que se pueda volver a
+        cargar (sus consumos ya guardados se descartan como duplicados).
+        
+        Returns:
+            bool: False si no había un archivo con esa huella
+        """
+        tree, metadatos = self._cargar()
+        if not metadatos.olvidar_archivo(huella):
+            return False
+        
+        self._escribir(tree, metadatos)
+        return True
+    
     # ==================== FACTURAS ====================
     
+    @_escritura
     def guardar_factura(self, factura):
-        """Guarda una factura."""
-        tree = ET.parse(self.archivo)
+        """Guarda una factura y actualiza las ventas diarias."""
+        tree, metadatos = self._cargar()
         root = tree.getroot()
         
         facturas_node = root.find('facturas')
         facturas_node.append(factura.to_xml_element())
+        metadatos.registrar_factura(factura)
         
-        ET.indent(tree, space="  ")
-        tree.write(self.archivo, encoding='utf-8', xml_declaration=True)
+        self._escribir(tree, metadatos)
     
     def obtener_facturas(self):
         """Obtiene todas las facturas."""
-        tree = ET.parse(self.archivo)
+        tree = self._parsear()
         root = tree.getroot()
         
         facturas = []
@@ -249,6 +944,37 @@ class XMLManager:
                 return factura
         return None
     
+    def obtener_facturas_en_rango(self, fecha_inicio, fecha_fin):
+        """
+        Obtiene las facturas emitidas en un rango de fechas usando el
+        índice ordenado por fecha.
+        
+        Args:
+            fecha_inicio (str): Fecha inicio en formato dd/mm/yyyy
+            fecha_fin (str): Fecha fin en formato dd/mm/yyyy
+            
+        Returns:
+            list: Facturas ordenadas por fecha
+        """
+        numeros = self._metadatos().facturas_en_rango(
+            fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin)
+        )
+        if not numeros:
+            return []
+        
+        tree = self._parsear()
+        root = tree.getroot()
+        
+        posicion = {numero: i for i, numero in enumerate(numeros)}
+        facturas = [None] * len(numeros)
+        
+        for fac_elem in root.find('facturas').findall('factura'):
+            numero = int(fac_elem.get('numero'))
+            if numero in posicion:
+                facturas[posicion[numero]] = Factura.from_xml_element(fac_elem)
+        
+        return [f for f in facturas if f is not None]
+    
     def obtener_facturas_por_cliente(self, nit_cliente):
         """Obtiene todas las facturas de un cliente."""
         facturas = self.obtener_facturas()
@@ -256,7 +982,98 @@ class XMLManager:
     
     def obtener_siguiente_numero_factura(self):
         """Obtiene el siguiente número de factura disponible."""
-        facturas = self.obtener_facturas()
-        if not facturas:
-            return 1
-        return max(f.numero for f in facturas) + 1
\ No newline at end of file
+        return self._metadatos().contadores['ultima_factura'] + 1
+    
+    # ==================== ESTADO ====================
+    
+    def obtener_contadores(self):
+        """
+        Obtiene los contadores del sistema mantenidos en cada escritura.
+        
+        Returns:
+            dict: Cantidades por entidad, instancias vigentes/canceladas,
+                  ingresos totales, factura mínima/máxima y clientes facturados
+        """
+        metadatos = self._metadatos()
+        contadores = dict(metadatos.contadores)
+        contadores['clientes_facturados'] = len(metadatos.clientes_facturados)
+        return contadores
+    
+    def obtener_version(self, *colecciones):
+        """
+        Versión de datos de una o varias colecciones, para armar ETags. Si
+        los metadatos están en memoria solo se consulta la firma del archivo.
+        
+        Args:
+            *colecciones: 'recursos', 'categorias', 'clientes' y/o 'facturas'
+            
+        Returns:
+            str: Época y versión de cada colección, p. ej. '9f1c2a7e-12-4'
+        """
+        metadatos = self._metadatos()
+        return '-'.join([metadatos.epoca] + [str(metadatos.versiones[c]) for c in colecciones])
+    
+    def obtener_consumos_pendientes(self, nit_cliente=None):
+        """
+        Obtiene el saldo pendiente de facturar por cliente e instancia.
+        
+        Args:
+            nit_cliente (str, optional): NIT del cliente
+            
+        Returns:
+            dict: {nit: {nombre, instancias: {id: {nombre, id_configuracion,
+                  consumos, horas, monto}}}} o None si el cliente no existe.
+                  Es una copia: los metadatos en memoria no se exponen.
+        """
+        pendientes = self._metadatos().pendientes
+        
+        if nit_cliente:
+            if nit_cliente not in pendientes:
+                return None
+            return {nit_cliente: copy.deepcopy(pendientes[nit_cliente])}
+        
+        return copy.deepcopy(pendientes)
+    
+    # ==================== ANÁLISIS ====================
+    
+    def obtener_catalogo_configuraciones(self):
+        """
+        Obtiene el nombre y la categoría de cada configuración.
+        
+        Returns:
+            dict: {id_config: {categoria_id, categoria_nombre, configuracion_nombre}} (copia)
+        """
+        return {
+            id_config: dict(datos)
+            for id_config, datos in self._metadatos().configuraciones.items()
+        }
+    
+    def obtener_ventas_por_configuracion(self, fecha_inicio, fecha_fin):
+        """
+        Suma las ventas diarias pre-agregadas por configuración.
+        
+        Args:
+            fecha_inicio (str): Fecha inicio en formato dd/mm/yyyy
+            fecha_fin (str): Fecha fin en formato dd/mm/yyyy
+            
+        Returns:
+            dict: {id_config: {ingresos, horas, instancias}}
+        """
+        return self._metadatos().ventas_por_configuracion(
+            fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin)
+        )
+    
+    def obtener_ventas_por_recurso(self, fecha_inicio, fecha_fin):
+        """
+        Suma las ventas diarias pre-agregadas por recurso.
+        
+        Args:
+            fecha_inicio (str): Fecha inicio en formato dd/mm/yyyy
+            fecha_fin (str): Fecha fin en formato dd/mm/yyyy
+            
+        Returns:
+            dict: {nombre_recurso: {ingresos, horas, cantidad, instancias}}
+        """
+        return self._metadatos().ventas_por_recurso(
+            fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin)
+        )
@@ -39,7 +39,8 @@ class Consumo:
         
         return Consumo(
             tiempo=tiempo,
-            fecha_hora=fecha_hora
+            fecha_hora=fecha_hora,
+            facturado=element.findtext('facturado') == 'True'
         )
     
     def to_xml_element(self):
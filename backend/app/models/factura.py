@@ -4,11 +4,15 @@ from datetime import datetime
 class DetalleFactura:
     """Representa el detalle de una factura por instancia."""
     
-    def __init__(self, id_instancia, nombre_instancia, horas_consumidas, costo_total):
+    def __init__(self, id_instancia, nombre_instancia, horas_consumidas, costo_total,
+                 id_configuracion=None, id_categoria=None):
         self._id_instancia = int(id_instancia)
         self._nombre_instancia = nombre_instancia
         self._horas_consumidas = float(horas_consumidas)
         self._costo_total = float(costo_total)
+        # Configuración y categoría vigentes al momento de facturar
+        self._id_configuracion = int(id_configuracion) if id_configuracion is not None else None
+        self._id_categoria = int(id_categoria) if id_categoria is not None else None
         self._detalles_recursos = []  # Lista de {recurso, cantidad, horas, costo}
     
     @property
@@ -27,6 +31,14 @@ class DetalleFactura:
     def costo_total(self):
         return self._costo_total
     
+    @property
+    def id_configuracion(self):
+        return self._id_configuracion
+    
+    @property
+    def id_categoria(self):
+        return self._id_categoria
+    
     @property
     def detalles_recursos(self):
         return self._detalles_recursos
@@ -45,6 +57,8 @@ class DetalleFactura:
             'nombre_instancia': self._nombre_instancia,
             'horas_consumidas': self._horas_consumidas,
             'costo_total': self._costo_total,
+            'id_configuracion': self._id_configuracion,
+            'id_categoria': self._id_categoria,
             'detalles_recursos': self._detalles_recursos
         }
 
@@ -110,6 +124,10 @@ class Factura:
             ET.SubElement(det_elem, 'nombreInstancia').text = detalle.nombre_instancia
             ET.SubElement(det_elem, 'horasConsumidas').text = str(detalle.horas_consumidas)
             ET.SubElement(det_elem, 'costoTotal').text = str(round(detalle.costo_total, 2))
+            if detalle.id_configuracion is not None:
+                ET.SubElement(det_elem, 'idConfiguracion').text = str(detalle.id_configuracion)
+            if detalle.id_categoria is not None:
+                ET.SubElement(det_elem, 'idCategoria').text = str(detalle.id_categoria)
             
             recursos_elem = ET.SubElement(det_elem, 'recursos')
             for rec in detalle.detalles_recursos:
@@ -138,8 +156,14 @@ class Factura:
                 nombre_inst = det_elem.find('nombreInstancia').text
                 horas = det_elem.find('horasConsumidas').text
                 costo = det_elem.find('costoTotal').text
+                id_config = det_elem.findtext('idConfiguracion')
+                id_cat = det_elem.findtext('idCategoria')
                 
-                detalle = DetalleFactura(id_inst, nombre_inst, horas, costo)
+                detalle = DetalleFactura(
+                    id_inst, nombre_inst, horas, costo,
+                    id_configuracion=id_config or None,
+                    id_categoria=id_cat or None
+                )
                 
                 # Cargar recursos del detalle
                 recursos_elem = det_elem.find('recursos')
@@ -1,5 +1,6 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime
+from .consumo import Consumo
 
 class Instancia:
     """Representa una instancia aprovisionada por un cliente."""
@@ -99,7 +100,7 @@ class Instancia:
         if fecha_final_elem is not None and fecha_final_elem.text:
             fecha_final = utils.extraer_fecha(fecha_final_elem.text)
         
-        return Instancia(
+        instancia = Instancia(
             id=element.get('id'),
             id_configuracion=element.find('idConfiguracion').text,
             nombre=element.find('nombre').text,
@@ -107,6 +108,13 @@ class Instancia:
             estado=element.find('estado').text,
             fecha_final=fecha_final
         )
+        
+        consumos_elem = element.find('listaConsumos')
+        if consumos_elem is not None:
+            for consumo_elem in consumos_elem.findall('consumo'):
+                instancia.agregar_consumo(Consumo.from_xml_element(consumo_elem, utils))
+        
+        return instancia
     
     def to_xml_element(self):
         inst_elem = ET.Element('instancia', id=str(self._id))
@@ -115,4 +123,9 @@ class Instancia:
         ET.SubElement(inst_elem, 'fechaInicio').text = self._fecha_inicio or ''
         ET.SubElement(inst_elem, 'estado').text = self._estado
         ET.SubElement(inst_elem, 'fechaFinal').text = self._fecha_final or ''
+        
+        consumos_elem = ET.SubElement(inst_elem, 'listaConsumos')
+        for consumo in self._consumos:
+            consumos_elem.append(consumo.to_xml_element())
+        
         return inst_elem
\ No newline at end of file
@@ -1,22 +1,39 @@
 # [file name]: app/routes/categoria_routes.py
 from flask import Blueprint, request, jsonify
+from app.database.xml_manager import CAMPOS_ORDEN
 from app.services.categoria_service import CategoriaService
+from app.utils.etag import condicional
+from app.utils.lote import leer_lote, respuesta_lote
+from app.utils.paginacion import Paginacion, metadatos_pagina
 
 categoria_bp = Blueprint('categoria', __name__)
 categoria_service = CategoriaService()
 
 @categoria_bp.route('/', methods=['GET'])
+@condicional(lambda: categoria_service.obtener_version())
 def obtener_categorias():
-    """Obtiene todas las categorías con sus configuraciones"""
+    """Obtiene las categorías con sus configuraciones (admite limit, offset/cursor, sort y fields)"""
     try:
-        incluir_configuraciones = request.args.get('incluir_configuraciones', 'true').lower() == 'true'
-        categorias = categoria_service.obtener_todas()
+        paginacion = Paginacion.desde_argumentos(request.args, CAMPOS_ORDEN['categorias'], 'id')
+        incluir_configuraciones = (
+            request.args.get('incluir_configuraciones', 'true').lower() == 'true'
+            and paginacion.incluye('configuraciones')
+        )
+        categorias, total, siguiente = categoria_service.obtener_pagina(paginacion)
         
-        return jsonify({
+        respuesta = {
             'success': True,
-            'data': [cat.to_dict(incluir_configuraciones) for cat in categorias],
-            'total': len(categorias)
-        }), 200
+            'data': [paginacion.proyectar(cat.to_dict(incluir_configuraciones)) for cat in categorias],
+            'total': total
+        }
+        if paginacion.activa:
+            respuesta['paginacion'] = metadatos_pagina(paginacion, total, siguiente)
+        return jsonify(respuesta), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -124,6 +141,24 @@ def agregar_configuracion(id_categoria):
             'message': f'Error al agregar configuración: {str(e)}'
         }), 500
 
+@categoria_bp.route('/<int:id_categoria>/configuraciones/lote', methods=['POST'])
+def agregar_configuraciones(id_categoria):
+    """Agrega varias configuraciones a una categoría en una sola escritura"""
+    try:
+        resultados = categoria_service.agregar_configuraciones(id_categoria, leer_lote())
+        return respuesta_lote(resultados, 'configuraciones')
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al agregar configuraciones: {str(e)}'
+        }), 500
+
 @categoria_bp.route('/configuraciones/<int:id_configuracion>', methods=['PUT'])
 def actualizar_configuracion(id_configuracion):
     """Actualiza una configuración existente"""
@@ -1,6 +1,11 @@
 # [file name]: app/routes/cliente_routes.py
 from flask import Blueprint, request, jsonify
+from app.database.xml_manager import CAMPOS_ORDEN
 from app.services.cliente_service import ClienteService
+from app.utils.etag import condicional
+from app.utils.lote import leer_lote, respuesta_lote
+from app.utils.ndjson import acepta_ndjson, encabezados_pagina, respuesta_ndjson
+from app.utils.paginacion import Paginacion, metadatos_pagina
 from app.utils.regex_utils import validar_nit
 from app.utils.validators import validar_estado_instancia, validar_fecha
 
@@ -8,15 +13,43 @@ cliente_bp = Blueprint('cliente', __name__)
 cliente_service = ClienteService()
 
 @cliente_bp.route('/', methods=['GET'])
+@condicional(lambda: cliente_service.obtener_version())
 def obtener_clientes():
-    """Obtiene todos los clientes con sus instancias"""
+    """
+    Obtiene los clientes con sus instancias (admite limit, offset/cursor,
+    sort y fields). Con Accept: application/x-ndjson se envían en streaming.
+    """
     try:
-        clientes = cliente_service.obtener_todos()
-        return jsonify({
+        paginacion = Paginacion.desde_argumentos(request.args, CAMPOS_ORDEN['clientes'], 'nit')
+        incluir_instancias = paginacion.incluye('instancias')
+        
+        if acepta_ndjson() and not paginacion.activa:
+            return respuesta_ndjson(
+                paginacion.proyectar(cliente.to_dict(incluir_instancias))
+                for cliente in cliente_service.iterar_todos()
+            )
+        
+        clientes, total, siguiente = cliente_service.obtener_pagina(paginacion)
+        
+        if acepta_ndjson():
+            return respuesta_ndjson(
+                (paginacion.proyectar(cliente.to_dict(incluir_instancias)) for cliente in clientes),
+                encabezados=encabezados_pagina(total, siguiente)
+            )
+        
+        respuesta = {
             'success': True,
-            'data': [cliente.to_dict() for cliente in clientes],
-            'total': len(clientes)
-        }), 200
+            'data': [paginacion.proyectar(cliente.to_dict(incluir_instancias)) for cliente in clientes],
+            'total': total
+        }
+        if paginacion.activa:
+            respuesta['paginacion'] = metadatos_pagina(paginacion, total, siguiente)
+        return jsonify(respuesta), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -89,6 +122,24 @@ def crear_cliente():
             'message': f'Error al crear cliente: {str(e)}'
         }), 500
 
+@cliente_bp.route('/lote', methods=['POST'])
+def crear_clientes():
+    """Crea varios clientes en una sola escritura; responde el resultado de cada uno"""
+    try:
+        resultados = cliente_service.crear_clientes(leer_lote())
+        return respuesta_lote(resultados, 'clientes')
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al crear clientes: {str(e)}'
+        }), 500
+
 @cliente_bp.route('/<string:nit>/instancias', methods=['POST'])
 def agregar_instancia(nit):
     """Agrega una instancia a un cliente"""
@@ -148,6 +199,24 @@ def agregar_instancia(nit):
             'message': f'Error al agregar instancia: {str(e)}'
         }), 500
 
+@cliente_bp.route('/<string:nit>/instancias/lote', methods=['POST'])
+def agregar_instancias(nit):
+    """Agrega varias instancias a un cliente en una sola escritura"""
+    try:
+        resultados = cliente_service.agregar_instancias(nit, leer_lote())
+        return respuesta_lote(resultados, 'instancias')
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al agregar instancias: {str(e)}'
+        }), 500
+
 @cliente_bp.route('/<string:nit>/instancias/<int:id_instancia>/cancelar', methods=['PUT'])
 def cancelar_instancia(nit, id_instancia):
     """Cancela una instancia de un cliente"""
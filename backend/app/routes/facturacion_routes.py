@@ -1,6 +1,9 @@
 # [file name]: app/routes/facturacion_routes.py
 from flask import Blueprint, request, jsonify
 from app.services.facturacion_service import FacturacionService
+from app.database.xml_manager import CAMPOS_ORDEN
+from app.utils.ndjson import acepta_ndjson, encabezados_pagina, respuesta_ndjson
+from app.utils.paginacion import Paginacion, metadatos_pagina
 from app.utils.validators import validar_rango_fechas
 
 facturacion_bp = Blueprint('facturacion', __name__)
@@ -58,16 +61,59 @@ def generar_facturas():
 
 @facturacion_bp.route('/', methods=['GET'])
 def obtener_facturas():
-    """Obtiene todas las facturas o las de un cliente específico"""
+    """
+    Obtiene todas las facturas, las de un cliente o las de un rango de fechas
+    (admite limit, offset/cursor, sort y fields). Con Accept: application/x-ndjson
+    se envían en streaming.
+    """
     try:
+        paginacion = Paginacion.desde_argumentos(request.args, CAMPOS_ORDEN['facturas'], 'numero')
         nit_cliente = request.args.get('nit_cliente')
-        facturas = facturacion_service.obtener_facturas(nit_cliente)
+        fecha_inicio = request.args.get('fecha_inicio')
+        fecha_fin = request.args.get('fecha_fin')
         
-        return jsonify({
+        if (fecha_inicio or fecha_fin) and not validar_rango_fechas(fecha_inicio, fecha_fin):
+            return jsonify({
+                'success': False,
+                'message': 'Rango de fechas inválido'
+            }), 400
+        
+        incluir_detalles = paginacion.incluye('detalles')
+        
+        if acepta_ndjson() and not paginacion.activa:
+            facturas = facturacion_service.iterar_facturas(nit_cliente, fecha_inicio, fecha_fin)
+            return respuesta_ndjson(
+                paginacion.proyectar(factura.to_dict(incluir_detalles)) for factura in facturas
+            )
+        
+        siguiente = None
+        if paginacion.activa:
+            facturas, total, siguiente = facturacion_service.obtener_pagina_facturas(
+                paginacion, nit_cliente, fecha_inicio, fecha_fin
+            )
+        else:
+            facturas = facturacion_service.obtener_facturas(nit_cliente, fecha_inicio, fecha_fin)
+            total = len(facturas)
+        
+        if acepta_ndjson():
+            return respuesta_ndjson(
+                (paginacion.proyectar(factura.to_dict(incluir_detalles)) for factura in facturas),
+                encabezados=encabezados_pagina(total, siguiente)
+            )
+        
+        respuesta = {
             'success': True,
-            'data': [factura.to_dict() for factura in facturas],
-            'total': len(facturas)
-        }), 200
+            'data': [paginacion.proyectar(factura.to_dict(incluir_detalles)) for factura in facturas],
+            'total': total
+        }
+        if paginacion.activa:
+            respuesta['paginacion'] = metadatos_pagina(paginacion, total, siguiente)
+        return jsonify(respuesta), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -190,6 +236,17 @@ def obtener_consumos_pendientes():
             'message': f'Error al obtener consumos pendientes: {str(e)}'
         }), 500
 
+@facturacion_bp.route('/cache', methods=['GET'])
+def obtener_estadisticas_cache():
+    """Obtiene las estadísticas de la caché de análisis y de los cálculos compartidos"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'cache': facturacion_service.cache.estadisticas(),
+            'coalescencia': facturacion_service.vuelos.estadisticas()
+        }
+    }), 200
+
 @facturacion_bp.route('/resumen', methods=['GET'])
 def obtener_resumen_facturacion():
     """Obtiene un resumen general de la facturación"""
@@ -1,21 +1,36 @@
 # [file name]: app/routes/recurso_routes.py
 from flask import Blueprint, request, jsonify
 from app.services.recurso_service import RecursoService
+from app.utils.etag import condicional
+from app.utils.lote import leer_lote, respuesta_lote
+from app.database.xml_manager import CAMPOS_ORDEN
+from app.utils.paginacion import Paginacion, metadatos_pagina
 from app.utils.validators import validar_tipo_recurso
 
 recurso_bp = Blueprint('recurso', __name__)
 recurso_service = RecursoService()
 
 @recurso_bp.route('/', methods=['GET'])
+@condicional(lambda: recurso_service.obtener_version())
 def obtener_recursos():
-    """Obtiene todos los recursos"""
+    """Obtiene los recursos (admite limit, offset/cursor, sort y fields)"""
     try:
-        recursos = recurso_service.obtener_todos()
-        return jsonify({
+        paginacion = Paginacion.desde_argumentos(request.args, CAMPOS_ORDEN['recursos'], 'id')
+        recursos, total, siguiente = recurso_service.obtener_pagina(paginacion)
+        
+        respuesta = {
             'success': True,
-            'data': [recurso.to_dict() for recurso in recursos],
-            'total': len(recursos)
-        }), 200
+            'data': [paginacion.proyectar(recurso.to_dict()) for recurso in recursos],
+            'total': total
+        }
+        if paginacion.activa:
+            respuesta['paginacion'] = metadatos_pagina(paginacion, total, siguiente)
+        return jsonify(respuesta), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -96,6 +111,24 @@ def crear_recurso():
             'message': f'Error al crear recurso: {str(e)}'
         }), 500
 
+@recurso_bp.route('/lote', methods=['POST'])
+def crear_recursos():
+    """Crea varios recursos en una sola escritura; responde el resultado de cada uno"""
+    try:
+        resultados = recurso_service.crear_recursos(leer_lote())
+        return respuesta_lote(resultados, 'recursos')
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al crear recursos: {str(e)}'
+        }), 500
+
 @recurso_bp.route('/<int:id_recurso>', methods=['PUT'])
 def actualizar_recurso(id_recurso):
     """Actualiza un recurso existente"""
@@ -1,7 +1,16 @@
 # [file name]: app/routes/sistema_routes.py
-from flask import Blueprint, request, jsonify
+import os
+import shutil
+import uuid
+from flask import Blueprint, Response, current_app, request, jsonify
+from app.config import Config
 from app.database.xml_manager import XMLManager
-from app.services.xml_procesor import XMLConfigProcessor, XMLConsumoProcessor
+from app.services.xml_procesor import XMLConfigProcessor, XMLConsumoProcessor, XMLConsumoProcessorParalelo
+from app.utils.etag import condicional
+from app.utils.metricas import metricas
+from app.utils.compresion import FlujoConHuella, abrir_flujo_xml, es_archivo_xml
+from app.utils.ndjson import acepta_ndjson, respuesta_ndjson
+from app.utils.perfilado import resumir_perfil
 
 sistema_bp = Blueprint('sistema', __name__)
 xml_manager = XMLManager()
@@ -38,25 +47,24 @@ def cargar_configuracion_xml():
                 'message': 'No se seleccionó ningún archivo'
             }), 400
         
-        if not archivo.filename.endswith('.xml'):
+        if not es_archivo_xml(archivo.filename):
             return jsonify({
                 'success': False,
-                'message': 'El archivo debe ser XML'
+                'message': 'El archivo debe ser XML (se acepta comprimido con gzip, xz o bz2)'
             }), 400
         
-        xml_content = archivo.read().decode('utf-8')
-        processor = XMLConfigProcessor(xml_content)
-        resultado = processor.procesar()
-        
-        # Guardar los objetos procesados en la base de datos
-        for recurso in processor.recursos:
-            xml_manager.guardar_recurso(recurso)
+        flujo, formato = abrir_flujo_xml(archivo.stream)
         
-        for categoria in processor.categorias:
-            xml_manager.guardar_categoria(categoria)
+        processor = XMLConfigProcessor(flujo)
+        resultado = processor.procesar()
+        resultado['compresion'] = formato
         
-        for cliente in processor.clientes:
-            xml_manager.guardar_cliente(cliente)
+        # Guardar los objetos procesados en una sola escritura
+        resultado.update(xml_manager.guardar_lote(
+            recursos=processor.recursos,
+            categorias=processor.categorias,
+            clientes=processor.clientes
+        ))
         
         return jsonify({
             'success': True,
@@ -87,23 +95,34 @@ def cargar_consumos_xml():
                 'message': 'No se seleccionó ningún archivo'
             }), 400
         
-        if not archivo.filename.endswith('.xml'):
+        if not es_archivo_xml(archivo.filename):
             return jsonify({
                 'success': False,
-                'message': 'El archivo debe ser XML'
+                'message': 'El archivo debe ser XML (se acepta comprimido con gzip, xz o bz2)'
             }), 400
         
-        xml_content = archivo.read().decode('utf-8')
-        processor = XMLConsumoProcessor(xml_content)
-        resultado = processor.procesar()
+        flujo, formato = abrir_flujo_xml(archivo.stream)
+        # La huella se calcula sobre el XML descomprimido mientras se lee
+        flujo = FlujoConHuella(flujo)
         
-        # Guardar los consumos procesados
-        for consumo in processor.consumos:
-            xml_manager.guardar_consumo(consumo)
+        # Un archivo comprimido no se puede partir por bloques: se procesa como stream
+        if (formato is None and Config.INGESTA_PARALELA_PROCESOS > 1
+                and (request.content_length or 0) >= Config.INGESTA_PARALELA_MIN_BYTES):
+            resultado = _cargar_consumos_paralelo(flujo)
+        else:
+            # Los consumos se descomprimen y parsean a medida que se leen del stream
+            processor = XMLConsumoProcessor(flujo)
+            resultado = xml_manager.guardar_consumos(processor.iterar(), huella=flujo.hexdigest)
+            resultado['consumos_procesados'] = processor.consumos_procesados
+        resultado['compresion'] = formato
+        
+        mensaje = 'Consumos XML procesados exitosamente'
+        if resultado['archivo_repetido']:
+            mensaje = 'El archivo ya había sido cargado; no se guardaron consumos'
         
         return jsonify({
             'success': True,
-            'message': 'Consumos XML procesados exitosamente',
+            'message': mensaje,
             'data': resultado
         }), 200
         
@@ -113,24 +132,88 @@ def cargar_consumos_xml():
             'message': f'Error al procesar consumos XML: {str(e)}'
         }), 500
 
+def _cargar_consumos_paralelo(flujo):
+    """Guarda el XML en disco y lo parsea por bloques en varios procesos"""
+    os.makedirs(Config.TEMP_FOLDER, exist_ok=True)
+    ruta = os.path.join(Config.TEMP_FOLDER, f'consumos_{uuid.uuid4().hex}.xml')
+    
+    try:
+        with open(ruta, 'wb') as destino:
+            shutil.copyfileobj(flujo, destino)
+        
+        # Con el archivo completo en disco la huella se conoce antes de parsearlo
+        huella = flujo.hexdigest()
+        if xml_manager.archivo_aplicado(huella):
+            return {
+                'consumos_guardados': 0,
+                'consumos_rechazados': 0,
+                'consumos_duplicados': 0,
+                'archivo_repetido': True,
+                'consumos_procesados': 0
+            }
+        
+        processor = XMLConsumoProcessorParalelo(ruta, procesos=Config.INGESTA_PARALELA_PROCESOS)
+        resultado = xml_manager.guardar_consumos(processor.iterar(), huella=huella)
+        resultado['consumos_procesados'] = processor.consumos_procesados
+        return resultado
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+@sistema_bp.route('/archivos-aplicados', methods=['GET'])
+def listar_archivos_aplicados():
+    """Lista las huellas de los archivos de consumos ya aplicados"""
+    try:
+        archivos = xml_manager.obtener_archivos_aplicados()
+        return jsonify({
+            'success': True,
+            'data': [{'huella': huella, **archivo} for huella, archivo in archivos.items()],
+            'total': len(archivos)
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al obtener archivos aplicados: {str(e)}'
+        }), 500
+
+@sistema_bp.route('/archivos-aplicados/<huella>', methods=['DELETE'])
+def olvidar_archivo_aplicado(huella):
+    """Olvida la huella de un archivo de consumos para poder volver a cargarlo"""
+    try:
+        if not xml_manager.olvidar_archivo(huella):
+            return jsonify({
+                'success': False,
+                'message': f'No hay un archivo aplicado con huella {huella}'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': 'Huella eliminada; el archivo se puede volver a cargar'
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al eliminar la huella: {str(e)}'
+        }), 500
+
 @sistema_bp.route('/estado', methods=['GET'])
+@condicional(lambda: xml_manager.obtener_version('recursos', 'categorias', 'clientes', 'facturas'))
 def obtener_estado_sistema():
     """Obtiene el estado actual del sistema"""
     try:
-        recursos = xml_manager.obtener_recursos()
-        categorias = xml_manager.obtener_categorias()
-        clientes = xml_manager.obtener_clientes()
-        facturas = xml_manager.obtener_facturas()
+        contadores = xml_manager.obtener_contadores()
         
         return jsonify({
             'success': True,
             'data': {
-                'recursos': len(recursos),
-                'categorias': len(categorias),
-                'clientes': len(clientes),
-                'facturas': len(facturas),
-                'instancias_activas': sum(len(cliente.instancias) for cliente in clientes),
-                'total_instancias': sum(len(cliente.instancias) for cliente in clientes)
+                'recursos': contadores['recursos'],
+                'categorias': contadores['categorias'],
+                'configuraciones': contadores['configuraciones'],
+                'clientes': contadores['clientes'],
+                'facturas': contadores['facturas'],
+                'instancias_activas': contadores['instancias_vigentes'],
+                'instancias_canceladas': contadores['instancias_canceladas'],
+                'total_instancias': contadores['instancias_vigentes'] + contadores['instancias_canceladas']
             }
         }), 200
     except Exception as e:
@@ -139,10 +222,69 @@ def obtener_estado_sistema():
             'message': f'Error al obtener estado del sistema: {str(e)}'
         }), 500
 
+@sistema_bp.route('/metrics', methods=['GET'])
+def obtener_metricas():
+    """Latencias por ruta y tiempos de lectura/escritura de data.xml en formato Prometheus"""
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+@sistema_bp.route('/perfiles', methods=['GET'])
+def listar_perfiles():
+    """Lista los perfiles guardados, del más reciente al más antiguo"""
+    carpeta = current_app.config.get('PERFILADO_CARPETA')
+    if not carpeta:
+        return jsonify({
+            'success': False,
+            'message': 'El perfilado no está habilitado'
+        }), 404
+    
+    perfiles = []
+    if os.path.isdir(carpeta):
+        perfiles = sorted((n for n in os.listdir(carpeta) if n.endswith('.prof')), reverse=True)
+    
+    return jsonify({
+        'success': True,
+        'data': perfiles,
+        'total': len(perfiles)
+    }), 200
+
+@sistema_bp.route('/perfiles/<nombre>', methods=['GET'])
+def obtener_perfil(nombre):
+    """Obtiene las funciones con mayor tiempo acumulado de un perfil (admite top)"""
+    carpeta = current_app.config.get('PERFILADO_CARPETA')
+    ruta = os.path.join(carpeta or '', os.path.basename(nombre))
+    if not carpeta or not nombre.endswith('.prof') or not os.path.isfile(ruta):
+        return jsonify({
+            'success': False,
+            'message': f'Perfil {nombre} no encontrado'
+        }), 404
+    
+    try:
+        top = int(request.args.get('top', current_app.config['PERFILADO_TOP']))
+        return jsonify({
+            'success': True,
+            'data': resumir_perfil(ruta, top)
+        }), 200
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'top debe ser un número entero'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al leer el perfil: {str(e)}'
+        }), 500
+
 @sistema_bp.route('/exportar-datos', methods=['GET'])
 def exportar_datos():
-    """Exporta todos los datos del sistema a XML"""
+    """
+    Exporta todos los datos del sistema a XML. Con Accept: application/x-ndjson
+    se envía en streaming un registro por línea: {"tipo": ..., "data": {...}}
+    """
     try:
+        if acepta_ndjson():
+            return respuesta_ndjson(_registros_exportacion())
+        
         xml_data = xml_manager.exportar_todo_a_xml()
         
         return jsonify({
@@ -154,4 +296,16 @@ def exportar_datos():
         return jsonify({
             'success': False,
             'message': f'Error al exportar datos: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+def _registros_exportacion():
+    """Recorre todas las colecciones del sistema una por una"""
+    colecciones = [
+        ('recurso', xml_manager.iterar_recursos),
+        ('categoria', xml_manager.iterar_categorias),
+        ('cliente', xml_manager.iterar_clientes),
+        ('factura', xml_manager.iterar_facturas)
+    ]
+    for tipo, iterar in colecciones:
+        for objeto in iterar():
+            yield {'tipo': tipo, 'data': objeto.to_dict()}
\ No newline at end of file
@@ -1,5 +1,6 @@
 from app.database.xml_manager import XMLManager
 from app.models import Categoria, Configuracion
+from app.utils.lote import campos_requeridos, validar_lote
 
 class CategoriaService:
     """Servicio para gestionar categorías y configuraciones."""
@@ -47,6 +48,19 @@ class CategoriaService:
         """
         return self.xml_manager.obtener_categorias()
     
+    def obtener_version(self):
+        """Versión de datos de las categorías y sus configuraciones, para el ETag del listado."""
+        return self.xml_manager.obtener_version('categorias')
+    
+    def obtener_pagina(self, paginacion):
+        """
+        Obtiene una página de categorías.
+        
+        Returns:
+            tuple: (categorías, total, siguiente cursor o None)
+        """
+        return self.xml_manager.obtener_pagina('categorias', paginacion)
+    
     def obtener_por_id(self, id_categoria):
         """
         Obtiene una categoría por su ID.
@@ -136,6 +150,53 @@ class CategoriaService:
         
         return configuracion
     
+    def agregar_configuraciones(self, id_categoria, lista):
+        """
+        Agrega varias configuraciones a una categoría cargándola y guardándola
+        una sola vez. Los IDs de configuración deben ser únicos en todo el
+        catálogo, porque las instancias y facturas los referencian sin categoría.
+        
+        Args:
+            id_categoria (int): ID de la categoría
+            lista (list): Datos de cada configuración (id, nombre, descripcion, recursos)
+        
+        Returns:
+            list: Resultado por elemento, en el orden recibido
+        
+        Raises:
+            ValueError: Si la categoría no existe
+        """
+        categoria = self.obtener_por_id(id_categoria)
+        if not categoria:
+            raise ValueError(f"Categoría con ID {id_categoria} no existe")
+        
+        ids_recursos = {r.id for r in self.xml_manager.obtener_recursos()}
+        
+        def configuracion_desde_datos(datos):
+            campos_requeridos(datos, ['id', 'nombre', 'descripcion'])
+            recursos = datos.get('recursos') or {}
+            for id_recurso in recursos.keys():
+                if int(id_recurso) not in ids_recursos:
+                    raise ValueError(f"Recurso con ID {id_recurso} no existe")
+            
+            return Configuracion(
+                id=datos['id'],
+                nombre=datos['nombre'],
+                descripcion=datos['descripcion'],
+                recursos_config=recursos
+            )
+        
+        configuraciones, resultados = validar_lote(
+            lista, configuracion_desde_datos, lambda config: config.id, 'Configuración con ID',
+            existentes=set(self.xml_manager.obtener_catalogo_configuraciones())
+        )
+        if configuraciones:
+            for configuracion in configuraciones:
+                categoria.agregar_configuracion(configuracion)
+            self.xml_manager.guardar_categoria(categoria)
+        
+        return resultados
+    
     def actualizar_configuracion(self, id_configuracion, datos):
         """
         Actualiza una configuración existente.
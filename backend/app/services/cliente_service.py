@@ -1,6 +1,8 @@
 from app.database.xml_manager import XMLManager
 from app.models import Cliente, Instancia
+from app.utils.lote import campos_requeridos, marcar_existentes, validar_lote
 from app.utils.regex_utils import validar_nit
+from app.utils.validators import validar_estado_instancia, validar_fecha
 
 class ClienteService:
     """Servicio para gestionar clientes e instancias."""
@@ -26,10 +28,60 @@ class ClienteService:
         self.xml_manager.guardar_cliente(cliente)
         return cliente
     
+    def crear_clientes(self, lista):
+        """
+        Crea varios clientes con una sola lectura y una sola escritura del XML.
+        Los elementos inválidos o con un NIT que ya existe no se guardan.
+        
+        Args:
+            lista (list): Datos de cada cliente
+        
+        Returns:
+            list: Resultado por elemento, en el orden recibido
+        """
+        clientes, resultados = validar_lote(lista, self._cliente_desde_datos,
+                                            lambda cliente: cliente.nit, 'Cliente con NIT')
+        if clientes:
+            conteo = self.xml_manager.guardar_lote(clientes=clientes, solo_nuevos=True)
+            marcar_existentes(resultados, conteo['existentes']['clientes'], 'Cliente con NIT')
+        return resultados
+    
+    @staticmethod
+    def _cliente_desde_datos(datos):
+        campos_requeridos(datos, ['nit', 'nombre', 'usuario', 'clave', 'direccion', 'correo_electronico'])
+        if not validar_nit(datos['nit']):
+            raise ValueError('Formato de NIT inválido. Debe ser: dígitos-[0-9K]')
+        
+        return Cliente(
+            nit=datos['nit'],
+            nombre=datos['nombre'],
+            usuario=datos['usuario'],
+            clave=datos['clave'],
+            direccion=datos['direccion'],
+            correo_electronico=datos['correo_electronico']
+        )
+    
     def obtener_todos(self):
         """Obtiene todos los clientes."""
         return self.xml_manager.obtener_clientes()
     
+    def iterar_todos(self):
+        """Recorre los clientes uno por uno sin cargarlos todos en memoria."""
+        return self.xml_manager.iterar_clientes()
+    
+    def obtener_version(self):
+        """Versión de los clientes con sus instancias; cambia el ETag de GET /api/clientes."""
+        return self.xml_manager.obtener_version('clientes')
+    
+    def obtener_pagina(self, paginacion):
+        """
+        Obtiene una página de clientes.
+        
+        Returns:
+            tuple: (clientes, total, siguiente cursor o None)
+        """
+        return self.xml_manager.obtener_pagina('clientes', paginacion)
+    
     def obtener_por_nit(self, nit):
         """Obtiene un cliente por NIT."""
         return self.xml_manager.obtener_cliente_por_nit(nit)
@@ -59,6 +111,58 @@ class ClienteService:
         
         return instancia
     
+    def agregar_instancias(self, nit_cliente, lista):
+        """
+        Agrega varias instancias a un cliente cargándolo y guardándolo una sola vez.
+        
+        Args:
+            nit_cliente (str): NIT del cliente
+            lista (list): Datos de cada instancia
+        
+        Returns:
+            list: Resultado por elemento, en el orden recibido
+        
+        Raises:
+            ValueError: Si el cliente no existe
+        """
+        cliente = self.obtener_por_nit(nit_cliente)
+        if not cliente:
+            raise ValueError(f"Cliente con NIT {nit_cliente} no existe")
+        
+        configuraciones = self.xml_manager.obtener_catalogo_configuraciones()
+        
+        def instancia_desde_datos(datos):
+            campos_requeridos(datos, ['id', 'id_configuracion', 'nombre', 'fecha_inicio', 'estado'])
+            if not validar_estado_instancia(datos['estado']):
+                raise ValueError('Estado de instancia inválido. Debe ser "Vigente" o "Cancelada"')
+            if not validar_fecha(datos['fecha_inicio']):
+                raise ValueError('Formato de fecha inválido. Use dd/mm/yyyy')
+            if datos.get('fecha_final') and not validar_fecha(datos['fecha_final']):
+                raise ValueError('Formato de fecha final inválido. Use dd/mm/yyyy')
+            
+            instancia = Instancia(
+                id=datos['id'],
+                id_configuracion=datos['id_configuracion'],
+                nombre=datos['nombre'],
+                fecha_inicio=datos['fecha_inicio'],
+                estado=datos['estado'],
+                fecha_final=datos.get('fecha_final')
+            )
+            if instancia.id_configuracion not in configuraciones:
+                raise ValueError(f"Configuración con ID {datos['id_configuracion']} no existe")
+            return instancia
+        
+        instancias, resultados = validar_lote(
+            lista, instancia_desde_datos, lambda instancia: instancia.id, 'Instancia con ID',
+            existentes={instancia.id for instancia in cliente.instancias}
+        )
+        if instancias:
+            for instancia in instancias:
+                cliente.agregar_instancia(instancia)
+            self.xml_manager.guardar_cliente(cliente)
+        
+        return resultados
+    
     def cancelar_instancia(self, nit_cliente, id_instancia, fecha_final):
         """Cancela una instancia de un cliente."""
         cliente = self.obtener_por_nit(nit_cliente)
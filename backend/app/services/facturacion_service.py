@@ -1,12 +1,24 @@
 from datetime import datetime
+from app.config import Config
+from app.database.metadatos import fecha_a_dia
 from app.database.xml_manager import XMLManager
 from app.models import Factura, DetalleFactura
+from app.utils.cache import CacheResultados
+from app.utils.singleflight import GrupoVuelos
 
 class FacturacionService:
     """Servicio para gestionar la facturación y análisis de ventas."""
     
-    def __init__(self, xml_manager=None):
+    def __init__(self, xml_manager=None, cache=None):
         self.xml_manager = xml_manager or XMLManager()
+        # Resultados de análisis y resumen, invalidados por la versión de las facturas
+        self.cache = cache or CacheResultados(Config.CACHE_ANALISIS_ENTRADAS, Config.CACHE_ANALISIS_TTL)
+        # Peticiones simultáneas iguales comparten un solo cálculo
+        self.vuelos = GrupoVuelos()
+    
+    def _cacheado(self, clave, calcular):
+        """Resultado de la caché o, si falta, de un único cálculo compartido."""
+        return self.cache.obtener_o_calcular(clave, lambda: self.vuelos.hacer(clave, calcular))
     
     def generar_facturas(self, fecha_inicio, fecha_fin):
         """
@@ -34,6 +46,7 @@ class FacturacionService:
         
         clientes = self.xml_manager.obtener_clientes()
         recursos_dict = {r.id: r for r in self.xml_manager.obtener_recursos()}
+        configuraciones_dict = self._mapear_configuraciones()
         
         facturas_generadas = []
         
@@ -42,7 +55,8 @@ class FacturacionService:
                 cliente, 
                 fecha_inicio_obj, 
                 fecha_fin_obj, 
-                recursos_dict
+                recursos_dict,
+                configuraciones_dict
             )
             
             if factura and factura.monto_total > 0:
@@ -51,7 +65,21 @@ class FacturacionService:
         
         return facturas_generadas
     
-    def _generar_factura_cliente(self, cliente, fecha_inicio, fecha_fin, recursos_dict):
+    def _mapear_configuraciones(self):
+        """
+        Relaciona cada configuración con su categoría.
+        
+        Returns:
+            dict: {id_configuracion: (Configuracion, Categoria)}
+        """
+        configuraciones_dict = {}
+        for categoria in self.xml_manager.obtener_categorias():
+            for config in categoria.configuraciones:
+                configuraciones_dict[config.id] = (config, categoria)
+        return configuraciones_dict
+    
+    def _generar_factura_cliente(self, cliente, fecha_inicio, fecha_fin, recursos_dict,
+                                 configuraciones_dict):
         """
         Genera una factura para un cliente específico.
         
@@ -60,6 +88,7 @@ class FacturacionService:
             fecha_inicio (datetime): Fecha inicio
             fecha_fin (datetime): Fecha fin
             recursos_dict (dict): Diccionario de recursos {id: Recurso}
+            configuraciones_dict (dict): {id_configuracion: (Configuracion, Categoria)}
             
         Returns:
             Factura: Factura generada o None si no hay consumos
@@ -77,7 +106,8 @@ class FacturacionService:
                 instancia, 
                 fecha_inicio, 
                 fecha_fin, 
-                recursos_dict
+                recursos_dict,
+                configuraciones_dict
             )
             
             if detalle and detalle.costo_total > 0:
@@ -89,7 +119,8 @@ class FacturacionService:
         
         return factura
     
-    def _procesar_instancia(self, instancia, fecha_inicio, fecha_fin, recursos_dict):
+    def _procesar_instancia(self, instancia, fecha_inicio, fecha_fin, recursos_dict,
+                            configuraciones_dict):
         """
         Procesa una instancia y genera su detalle de factura.
         
@@ -98,6 +129,7 @@ class FacturacionService:
             fecha_inicio (datetime): Fecha inicio
             fecha_fin (datetime): Fecha fin
             recursos_dict (dict): Diccionario de recursos
+            configuraciones_dict (dict): {id_configuracion: (Configuracion, Categoria)}
             
         Returns:
             DetalleFactura: Detalle generado o None si no hay consumos
@@ -131,15 +163,17 @@ class FacturacionService:
             return None
         
         # Obtener la configuración de la instancia
-        configuracion = self.xml_manager.obtener_configuracion_por_id(instancia.id_configuracion)
-        if not configuracion:
+        if instancia.id_configuracion not in configuraciones_dict:
             return None
+        configuracion, categoria = configuraciones_dict[instancia.id_configuracion]
         
         detalle = DetalleFactura(
             id_instancia=instancia.id,
             nombre_instancia=instancia.nombre,
             horas_consumidas=horas_totales,
-            costo_total=0.0
+            costo_total=0.0,
+            id_configuracion=configuracion.id,
+            id_categoria=categoria.id
         )
         
         # Calcular costo por cada recurso de la configuración
@@ -163,20 +197,62 @@ class FacturacionService:
         
         return detalle
     
-    def obtener_facturas(self, nit_cliente=None):
+    def obtener_facturas(self, nit_cliente=None, fecha_inicio=None, fecha_fin=None):
         """
         Obtiene todas las facturas o las de un cliente específico.
         
         Args:
             nit_cliente (str, optional): NIT del cliente
+            fecha_inicio (str, optional): Fecha inicio en formato dd/mm/yyyy
+            fecha_fin (str, optional): Fecha fin en formato dd/mm/yyyy
             
         Returns:
             list: Lista de facturas
         """
+        if fecha_inicio and fecha_fin:
+            self._validar_fechas(fecha_inicio, fecha_fin)
+            facturas = self.xml_manager.obtener_facturas_en_rango(fecha_inicio, fecha_fin)
+            if nit_cliente:
+                facturas = [f for f in facturas if f.nit_cliente == nit_cliente]
+            return facturas
+        
         if nit_cliente:
             return self.xml_manager.obtener_facturas_por_cliente(nit_cliente)
         return self.xml_manager.obtener_facturas()
     
+    def iterar_facturas(self, nit_cliente=None, fecha_inicio=None, fecha_fin=None):
+        """
+        Recorre las facturas una por una, con los mismos filtros que
+        obtener_facturas. Las fechas se validan antes de empezar a leer.
+        
+        Returns:
+            iterator: Facturas en el orden del archivo
+            
+        Raises:
+            ValueError: Si el formato de fechas es inválido
+        """
+        if fecha_inicio and fecha_fin:
+            self._validar_fechas(fecha_inicio, fecha_fin)
+        
+        return self.xml_manager.iterar_facturas(nit_cliente, fecha_inicio, fecha_fin)
+    
+    def obtener_pagina_facturas(self, paginacion, nit_cliente=None, fecha_inicio=None, fecha_fin=None):
+        """
+        Obtiene una página de facturas, con los mismos filtros que obtener_facturas.
+        
+        Returns:
+            tuple: (facturas, total, siguiente cursor o None)
+        """
+        if fecha_inicio and fecha_fin:
+            self._validar_fechas(fecha_inicio, fecha_fin)
+        
+        return self.xml_manager.obtener_pagina(
+            'facturas', paginacion,
+            nit_cliente=nit_cliente,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        )
+    
     def obtener_factura_por_numero(self, numero):
         """
         Obtiene una factura por su número.
@@ -192,6 +268,8 @@ class FacturacionService:
     def analizar_ventas_por_categoria(self, fecha_inicio, fecha_fin):
         """
         Analiza las ventas por categoría y configuración en un rango de fechas.
+        Suma las ventas diarias que el almacenamiento pre-agrega al guardar
+        cada factura.
         
         Args:
             fecha_inicio (str): Fecha inicio en formato dd/mm/yyyy
@@ -200,71 +278,41 @@ class FacturacionService:
         Returns:
             list: Lista ordenada por ingresos descendente
         """
-        try:
-            fecha_inicio_obj = datetime.strptime(fecha_inicio, '%d/%m/%Y')
-            fecha_fin_obj = datetime.strptime(fecha_fin, '%d/%m/%Y')
-        except ValueError:
-            raise ValueError("Formato de fecha inválido. Use dd/mm/yyyy")
+        self._validar_fechas(fecha_inicio, fecha_fin)
         
-        facturas = self.xml_manager.obtener_facturas()
-        categorias = self.xml_manager.obtener_categorias()
-        
-        # Filtrar facturas en el rango
-        facturas_rango = []
-        for f in facturas:
-            try:
-                fecha_factura = datetime.strptime(f.fecha, '%d/%m/%Y')
-                if fecha_inicio_obj <= fecha_factura <= fecha_fin_obj:
-                    facturas_rango.append(f)
-            except ValueError:
-                continue
+        # Los nombres salen del catálogo, así que también depende de las categorías
+        clave = ('analisis_categorias', fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin),
+                 self.xml_manager.obtener_version('facturas', 'categorias'))
+        return self._cacheado(clave, lambda: self._calcular_ventas_por_categoria(fecha_inicio, fecha_fin))
+    
+    def _calcular_ventas_por_categoria(self, fecha_inicio, fecha_fin):
+        ventas = self.xml_manager.obtener_ventas_por_configuracion(fecha_inicio, fecha_fin)
+        catalogo = self.xml_manager.obtener_catalogo_configuraciones()
         
-        # Crear mapeo de configuraciones a categorías
-        config_to_cat = {}
-        config_info = {}
+        resultado = []
+        for id_config, valores in ventas.items():
+            if id_config not in catalogo or valores['ingresos'] <= 0:
+                continue
+            
+            info = catalogo[id_config]
+            resultado.append({
+                'categoria_id': info['categoria_id'],
+                'categoria_nombre': info['categoria_nombre'],
+                'configuracion_id': id_config,
+                'configuracion_nombre': info['configuracion_nombre'],
+                'ingresos': round(valores['ingresos'], 2),
+                'instancias_vendidas': valores['instancias'],
+                'horas_totales': round(valores['horas'], 2)
+            })
         
-        for categoria in categorias:
-            for config in categoria.configuraciones:
-                config_to_cat[config.id] = categoria
-                config_info[config.id] = {
-                    'categoria_id': categoria.id,
-                    'categoria_nombre': categoria.nombre,
-                    'configuracion_id': config.id,
-                    'configuracion_nombre': config.nombre,
-                    'ingresos': 0.0,
-                    'instancias_vendidas': 0,
-                    'horas_totales': 0.0
-                }
-        
-        # Análisis por configuración
-        for factura in facturas_rango:
-            for detalle in factura.detalles:
-                # Buscar la configuración de la instancia
-                cliente = self.xml_manager.obtener_cliente_por_nit(factura.nit_cliente)
-                if cliente:
-                    instancia = cliente.obtener_instancia_por_id(detalle.id_instancia)
-                    if instancia:
-                        id_config = instancia.id_configuracion
-                        
-                        if id_config in config_info:
-                            config_info[id_config]['ingresos'] += detalle.costo_total
-                            config_info[id_config]['instancias_vendidas'] += 1
-                            config_info[id_config]['horas_totales'] += detalle.horas_consumidas
-        
-        # Filtrar solo las que tienen ventas y ordenar
-        resultado = [info for info in config_info.values() if info['ingresos'] > 0]
         resultado.sort(key=lambda x: x['ingresos'], reverse=True)
-        
-        # Redondear valores
-        for item in resultado:
-            item['ingresos'] = round(item['ingresos'], 2)
-            item['horas_totales'] = round(item['horas_totales'], 2)
-        
         return resultado
     
     def analizar_ventas_por_recurso(self, fecha_inicio, fecha_fin):
         """
         Analiza las ventas por recurso en un rango de fechas.
+        Suma las ventas diarias que el almacenamiento pre-agrega al guardar
+        cada factura.
         
         Args:
             fecha_inicio (str): Fecha inicio en formato dd/mm/yyyy
@@ -273,62 +321,45 @@ class FacturacionService:
         Returns:
             list: Lista ordenada por ingresos descendente
         """
-        try:
-            fecha_inicio_obj = datetime.strptime(fecha_inicio, '%d/%m/%Y')
-            fecha_fin_obj = datetime.strptime(fecha_fin, '%d/%m/%Y')
-        except ValueError:
-            raise ValueError("Formato de fecha inválido. Use dd/mm/yyyy")
-        
-        facturas = self.xml_manager.obtener_facturas()
+        self._validar_fechas(fecha_inicio, fecha_fin)
         
-        # Filtrar facturas en el rango
-        facturas_rango = []
-        for f in facturas:
-            try:
-                fecha_factura = datetime.strptime(f.fecha, '%d/%m/%Y')
-                if fecha_inicio_obj <= fecha_factura <= fecha_fin_obj:
-                    facturas_rango.append(f)
-            except ValueError:
-                continue
-        
-        # Análisis por recurso
-        analisis_recursos = {}
-        
-        for factura in facturas_rango:
-            for detalle in factura.detalles:
-                for detalle_recurso in detalle.detalles_recursos:
-                    nombre_recurso = detalle_recurso['recurso']
-                    
-                    if nombre_recurso not in analisis_recursos:
-                        analisis_recursos[nombre_recurso] = {
-                            'recurso': nombre_recurso,
-                            'ingresos': 0.0,
-                            'horas_totales': 0.0,
-                            'cantidad_total_usada': 0.0
-                        }
-                    
-                    analisis_recursos[nombre_recurso]['ingresos'] += detalle_recurso['costo']
-                    analisis_recursos[nombre_recurso]['horas_totales'] += detalle_recurso['horas']
-                    analisis_recursos[nombre_recurso]['cantidad_total_usada'] += detalle_recurso['cantidad']
-        
-        # Ordenar por ingresos
-        resultado = sorted(
-            analisis_recursos.values(),
-            key=lambda x: x['ingresos'],
-            reverse=True
-        )
-        
-        # Redondear valores
-        for item in resultado:
-            item['ingresos'] = round(item['ingresos'], 2)
-            item['horas_totales'] = round(item['horas_totales'], 2)
-            item['cantidad_total_usada'] = round(item['cantidad_total_usada'], 2)
+        clave = ('analisis_recursos', fecha_a_dia(fecha_inicio), fecha_a_dia(fecha_fin),
+                 self.xml_manager.obtener_version('facturas'))
+        return self._cacheado(clave, lambda: self._calcular_ventas_por_recurso(fecha_inicio, fecha_fin))
+    
+    def _calcular_ventas_por_recurso(self, fecha_inicio, fecha_fin):
+        ventas = self.xml_manager.obtener_ventas_por_recurso(fecha_inicio, fecha_fin)
+        
+        resultado = [
+            {
+                'recurso': nombre_recurso,
+                'ingresos': round(valores['ingresos'], 2),
+                'horas_totales': round(valores['horas'], 2),
+                'cantidad_total_usada': round(valores['cantidad'], 2)
+            }
+            for nombre_recurso, valores in ventas.items()
+        ]
+        resultado.sort(key=lambda x: x['ingresos'], reverse=True)
         
         return resultado
     
+    def _validar_fechas(self, fecha_inicio, fecha_fin):
+        """
+        Valida el formato dd/mm/yyyy de un rango de fechas.
+        
+        Raises:
+            ValueError: Si el formato de fechas es inválido
+        """
+        try:
+            datetime.strptime(fecha_inicio, '%d/%m/%Y')
+            datetime.strptime(fecha_fin, '%d/%m/%Y')
+        except ValueError:
+            raise ValueError("Formato de fecha inválido. Use dd/mm/yyyy")
+    
     def obtener_consumos_pendientes(self, nit_cliente=None):
         """
-        Obtiene los consumos pendientes de facturar.
+        Obtiene los consumos pendientes de facturar a partir del saldo que
+        el almacenamiento mantiene por instancia.
         
         Args:
             nit_cliente (str, optional): NIT del cliente
@@ -336,69 +367,61 @@ class FacturacionService:
         Returns:
             dict: Diccionario con información de consumos pendientes
         """
-        clientes = self.xml_manager.obtener_clientes()
-        
-        if nit_cliente:
-            cliente_especifico = self.xml_manager.obtener_cliente_por_nit(nit_cliente)
-            if cliente_especifico:
-                clientes = [cliente_especifico]
-            else:
-                return {'error': f'Cliente con NIT {nit_cliente} no encontrado'}
+        # Los montos dependen de los precios, así que también cuentan recursos y categorías
+        clave = ('consumos_pendientes', nit_cliente,
+                 self.xml_manager.obtener_version('clientes', 'recursos', 'categorias'))
+        return self.vuelos.hacer(clave, lambda: self._calcular_consumos_pendientes(nit_cliente))
+    
+    def _calcular_consumos_pendientes(self, nit_cliente):
+        pendientes = self.xml_manager.obtener_consumos_pendientes(nit_cliente)
+        if pendientes is None:
+            return {'error': f'Cliente con NIT {nit_cliente} no encontrado'}
         
         resultado = []
         
-        for cliente in clientes:
+        for nit, cliente in pendientes.items():
+            if not cliente['instancias']:
+                continue
+            
             info_cliente = {
-                'nit': cliente.nit,
-                'nombre': cliente.nombre,
+                'nit': nit,
+                'nombre': cliente['nombre'],
                 'instancias': []
             }
             
             total_pendiente_cliente = 0.0
             
-            for instancia in cliente.instancias:
-                consumos_pendientes = [c for c in instancia.consumos if not c.facturado]
-                
-                if consumos_pendientes:
-                    horas_pendientes = sum(c.tiempo for c in consumos_pendientes)
-                    
-                    # Calcular monto pendiente
-                    configuracion = self.xml_manager.obtener_configuracion_por_id(instancia.id_configuracion)
-                    recursos_dict = {r.id: r for r in self.xml_manager.obtener_recursos()}
-                    
-                    monto_pendiente = 0.0
-                    if configuracion:
-                        for id_recurso, cantidad in configuracion.recursos_config.items():
-                            if id_recurso in recursos_dict:
-                                recurso = recursos_dict[id_recurso]
-                                monto_pendiente += recurso.calcular_costo(horas_pendientes, cantidad)
-                    
-                    info_cliente['instancias'].append({
-                        'id_instancia': instancia.id,
-                        'nombre_instancia': instancia.nombre,
-                        'consumos_pendientes': len(consumos_pendientes),
-                        'horas_pendientes': round(horas_pendientes, 2),
-                        'monto_pendiente': round(monto_pendiente, 2)
-                    })
-                    
-                    total_pendiente_cliente += monto_pendiente
+            for id_instancia, pendiente in cliente['instancias'].items():
+                info_cliente['instancias'].append({
+                    'id_instancia': id_instancia,
+                    'nombre_instancia': pendiente['nombre'],
+                    'consumos_pendientes': pendiente['consumos'],
+                    'horas_pendientes': round(pendiente['horas'], 2),
+                    'monto_pendiente': round(pendiente['monto'], 2)
+                })
+                total_pendiente_cliente += pendiente['monto']
             
-            if info_cliente['instancias']:
-                info_cliente['total_pendiente'] = round(total_pendiente_cliente, 2)
-                resultado.append(info_cliente)
+            info_cliente['total_pendiente'] = round(total_pendiente_cliente, 2)
+            resultado.append(info_cliente)
         
         return resultado
     
     def obtener_resumen_facturacion(self):
         """
-        Obtiene un resumen general de la facturación.
+        Obtiene un resumen general de la facturación a partir de los
+        contadores que mantiene el almacenamiento.
         
         Returns:
             dict: Resumen con estadísticas
         """
-        facturas = self.xml_manager.obtener_facturas()
+        clave = ('resumen', self.xml_manager.obtener_version('facturas'))
+        return self._cacheado(clave, self._calcular_resumen)
+    
+    def _calcular_resumen(self):
+        contadores = self.xml_manager.obtener_contadores()
+        total_facturas = contadores['facturas']
         
-        if not facturas:
+        if not total_facturas:
             return {
                 'total_facturas': 0,
                 'ingresos_totales': 0.0,
@@ -406,14 +429,13 @@ class FacturacionService:
                 'clientes_facturados': 0
             }
         
-        ingresos_totales = sum(f.monto_total for f in facturas)
-        clientes_unicos = len(set(f.nit_cliente for f in facturas))
+        ingresos_totales = contadores['ingresos_totales']
         
         return {
-            'total_facturas': len(facturas),
+            'total_facturas': total_facturas,
             'ingresos_totales': round(ingresos_totales, 2),
-            'factura_promedio': round(ingresos_totales / len(facturas), 2),
-            'clientes_facturados': clientes_unicos,
-            'factura_minima': round(min(f.monto_total for f in facturas), 2),
-            'factura_maxima': round(max(f.monto_total for f in facturas), 2)
-        }
\ No newline at end of file
+            'factura_promedio': round(ingresos_totales / total_facturas, 2),
+            'clientes_facturados': contadores['clientes_facturados'],
+            'factura_minima': round(contadores['factura_minima'], 2),
+            'factura_maxima': round(contadores['factura_maxima'], 2)
+        }
@@ -1,5 +1,7 @@
 from app.database.xml_manager import XMLManager
 from app.models import Recurso
+from app.utils.lote import campos_requeridos, marcar_existentes, validar_lote
+from app.utils.validators import validar_tipo_recurso
 
 class RecursoService:
     """Servicio para gestionar recursos."""
@@ -29,10 +31,58 @@ class RecursoService:
         self.xml_manager.guardar_recurso(recurso)
         return recurso
     
+    def crear_recursos(self, lista):
+        """
+        Crea varios recursos con una sola lectura y una sola escritura del XML.
+        Los elementos inválidos o con un ID que ya existe no se guardan.
+        
+        Args:
+            lista (list): Datos de cada recurso
+        
+        Returns:
+            list: Resultado por elemento, en el orden recibido
+        """
+        recursos, resultados = validar_lote(lista, self._recurso_desde_datos,
+                                            lambda recurso: recurso.id, 'Recurso con ID')
+        if recursos:
+            conteo = self.xml_manager.guardar_lote(recursos=recursos, solo_nuevos=True)
+            marcar_existentes(resultados, conteo['existentes']['recursos'], 'Recurso con ID')
+        return resultados
+    
+    @staticmethod
+    def _recurso_desde_datos(datos):
+        campos_requeridos(datos, ['id', 'nombre', 'abreviatura', 'metrica', 'tipo', 'valor_x_hora'])
+        if not validar_tipo_recurso(datos['tipo']):
+            raise ValueError('Tipo de recurso inválido. Debe ser "Hardware" o "Software"')
+        if datos['valor_x_hora'] <= 0:
+            raise ValueError('El valor por hora debe ser mayor a 0')
+        
+        return Recurso(
+            id=datos['id'],
+            nombre=datos['nombre'],
+            abreviatura=datos['abreviatura'],
+            metrica=datos['metrica'],
+            tipo=datos['tipo'],
+            valor_x_hora=datos['valor_x_hora']
+        )
+    
     def obtener_todos(self):
         """Obtiene todos los recursos."""
         return self.xml_manager.obtener_recursos()
     
+    def obtener_version(self):
+        """Versión de la colección de recursos (ETag del listado)."""
+        return self.xml_manager.obtener_version('recursos')
+    
+    def obtener_pagina(self, paginacion):
+        """
+        Obtiene una página de recursos.
+        
+        Returns:
+            tuple: (recursos, total, siguiente cursor o None)
+        """
+        return self.xml_manager.obtener_pagina('recursos', paginacion)
+    
     def obtener_por_id(self, id_recurso):
         """Obtiene un recurso por ID."""
         return self.xml_manager.obtener_recurso_por_id(id_recurso)
@@ -1,21 +1,76 @@
+import io
+import multiprocessing
+import os
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from app.models import Recurso, Categoria, Cliente, Consumo
 from app.utils import regex_utils
 
+
+def _abrir_origen(origen):
+    """
+    Acepta el XML como texto, bytes o un archivo binario ya abierto
+    (p. ej. el stream de la petición) y devuelve algo legible por iterparse.
+    """
+    if isinstance(origen, str):
+        return io.StringIO(origen)
+    if isinstance(origen, bytes):
+        return io.BytesIO(origen)
+    return origen
+
+
+def _iterar_elementos(origen, rutas):
+    """
+    Recorre el XML con iterparse y entrega los elementos cuya ruta desde la
+    raíz esté en `rutas` (p. ej. 'listaRecursos/recurso').
+    
+    Cada elemento se limpia y se quita de su padre después de procesarse,
+    así la memoria no crece con el tamaño del archivo.
+    """
+    etiquetas = {ruta.split('/')[-1] for ruta in rutas}
+    pila = []
+    
+    for evento, elem in ET.iterparse(origen, events=('start', 'end')):
+        if evento == 'start':
+            pila.append(elem)
+            continue
+        
+        pila.pop()
+        if elem.tag not in etiquetas or not pila:
+            continue
+        
+        ruta = '/'.join([e.tag for e in pila[1:]] + [elem.tag])
+        if ruta in rutas:
+            yield elem
+            elem.clear()
+            pila[-1].remove(elem)
+
+
 class XMLConfigProcessor:
     """Procesa el XML de configuración de entrada."""
     
-    def __init__(self, xml_string):
-        self.root = ET.fromstring(xml_string)
+    def __init__(self, origen):
+        """
+        Args:
+            origen: XML como texto/bytes o un archivo binario abierto
+        """
+        self.origen = _abrir_origen(origen)
         self.recursos = []
         self.categorias = []
         self.clientes = []
     
     def procesar(self):
         """Procesa todo el XML y extrae todos los objetos."""
-        self._procesar_recursos()
-        self._procesar_categorias()
-        self._procesar_clientes()
+        procesadores = {
+            'recurso': self._procesar_recurso,
+            'categoria': self._procesar_categoria,
+            'cliente': self._procesar_cliente
+        }
+        rutas = {'listaRecursos/recurso', 'listaCategorias/categoria', 'listaClientes/cliente'}
+        
+        for elem in _iterar_elementos(self.origen, rutas):
+            procesadores[elem.tag](elem)
         
         return {
             'recursos_procesados': len(self.recursos),
@@ -25,58 +80,56 @@ class XMLConfigProcessor:
             'configuraciones_procesadas': sum(len(cat.configuraciones) for cat in self.categorias)
         }
     
-    def _procesar_recursos(self):
-        """Procesa todos los recursos del XML."""
-        lista_recursos = self.root.find('listaRecursos')
-        
-        if lista_recursos is not None:
-            for recurso_elem in lista_recursos.findall('recurso'):
-                try:
-                    recurso = Recurso.from_xml_element(recurso_elem)
-                    self.recursos.append(recurso)
-                except Exception as e:
-                    print(f"Error procesando recurso: {e}")
-    
-    def _procesar_categorias(self):
-        """Procesa todas las categorías del XML."""
-        lista_categorias = self.root.find('listaCategorias')
-        
-        if lista_categorias is not None:
-            for categoria_elem in lista_categorias.findall('categoria'):
-                try:
-                    categoria = Categoria.from_xml_element(categoria_elem)
-                    self.categorias.append(categoria)
-                except Exception as e:
-                    print(f"Error procesando categoría: {e}")
-    
-    def _procesar_clientes(self):
-        """Procesa todos los clientes del XML."""
-        lista_clientes = self.root.find('listaClientes')
-        
-        if lista_clientes is not None:
-            for cliente_elem in lista_clientes.findall('cliente'):
-                try:
-                    nit = cliente_elem.get('nit')
-                    if not regex_utils.validar_nit(nit):
-                        print(f"NIT inválido: {nit}")
-                        continue
-                    
-                    cliente = Cliente.from_xml_element(cliente_elem, regex_utils)
-                    self.clientes.append(cliente)
-                except Exception as e:
-                    print(f"Error procesando cliente: {e}")
+    def _procesar_recurso(self, recurso_elem):
+        """Procesa un recurso del XML."""
+        try:
+            recurso = Recurso.from_xml_element(recurso_elem)
+            self.recursos.append(recurso)
+        except Exception as e:
+            print(f"Error procesando recurso: {e}")
+    
+    def _procesar_categoria(self, categoria_elem):
+        """Procesa una categoría del XML."""
+        try:
+            categoria = Categoria.from_xml_element(categoria_elem)
+            self.categorias.append(categoria)
+        except Exception as e:
+            print(f"Error procesando categoría: {e}")
+    
+    def _procesar_cliente(self, cliente_elem):
+        """Procesa un cliente del XML."""
+        try:
+            nit = cliente_elem.get('nit')
+            if not regex_utils.validar_nit(nit):
+                print(f"NIT inválido: {nit}")
+                return
+            
+            cliente = Cliente.from_xml_element(cliente_elem, regex_utils)
+            self.clientes.append(cliente)
+        except Exception as e:
+            print(f"Error procesando cliente: {e}")
 
 
 class XMLConsumoProcessor:
     """Procesa el XML de consumos de entrada."""
     
-    def __init__(self, xml_string):
-        self.root = ET.fromstring(xml_string)
+    def __init__(self, origen):
+        """
+        Args:
+            origen: XML como texto/bytes o un archivo binario abierto
+        """
+        self.origen = _abrir_origen(origen)
         self.consumos = []  # Lista de tuplas (nit, id_instancia, consumo)
+        self.consumos_procesados = 0
     
-    def procesar(self):
-        """Procesa todos los consumos del XML."""
-        for consumo_elem in self.root.findall('consumo'):
+    def iterar(self):
+        """
+        Recorre los consumos del XML sin cargar el documento completo.
+        
+        Yields:
+            tuple: (nit, id_instancia, consumo) por cada consumo válido
+        """
+        for consumo_elem in _iterar_elementos(self.origen, {'consumo'}):
             try:
                 nit_cliente = consumo_elem.get('nitCliente')
                 id_instancia = int(consumo_elem.get('idInstancia'))
@@ -86,11 +139,160 @@ class XMLConsumoProcessor:
                     continue
                 
                 consumo = Consumo.from_xml_element(consumo_elem, regex_utils)
-                self.consumos.append((nit_cliente, id_instancia, consumo))
-                
+            
             except Exception as e:
                 print(f"Error procesando consumo: {e}")
+                continue
+            
+            self.consumos_procesados += 1
+            yield (nit_cliente, id_instancia, consumo)
+    
+    def procesar(self):
+        """Procesa todos los consumos del XML."""
+        self.consumos = list(self.iterar())
         
         return {
             'consumos_procesados': len(self.consumos)
-        }
\ No newline at end of file
+        }
+
+
+# Tamaño aproximado de cada bloque que procesa un worker en modo paralelo
+TAMANO_BLOQUE = 8 * 1024 * 1024
+
+_APERTURA_CONSUMO = b'<consumo'
+_CIERRE_CONSUMO = b'</consumo>'
+
+
+def _buscar_apertura(archivo, posicion, limite):
+    """
+    Devuelve la posición del primer '<consumo' (seguido de espacio, '>' o '/')
+    a partir de `posicion`, o `limite` si no hay ninguno antes.
+    """
+    archivo.seek(posicion)
+    while posicion < limite:
+        datos = archivo.read(64 * 1024 + len(_APERTURA_CONSUMO))
+        if not datos:
+            break
+        
+        inicio = 0
+        while True:
+            encontrado = datos.find(_APERTURA_CONSUMO, inicio)
+            if encontrado == -1 or encontrado + len(_APERTURA_CONSUMO) >= len(datos):
+                break
+            siguiente = datos[encontrado + len(_APERTURA_CONSUMO):encontrado + len(_APERTURA_CONSUMO) + 1]
+            if siguiente in (b' ', b'>', b'/', b'\t', b'\n', b'\r'):
+                return min(posicion + encontrado, limite)
+            inicio = encontrado + 1
+        
+        # Se retrocede un poco para no partir una etiqueta entre dos lecturas
+        posicion += max(len(datos) - len(_APERTURA_CONSUMO), 1)
+        archivo.seek(posicion)
+    
+    return limite
+
+
+def _buscar_ultimo_cierre(archivo, tamano):
+    """Devuelve la posición donde termina el último '</consumo>' del archivo."""
+    posicion = tamano
+    while posicion > 0:
+        inicio = max(0, posicion - 64 * 1024)
+        archivo.seek(inicio)
+        datos = archivo.read(posicion - inicio + len(_CIERRE_CONSUMO))
+        encontrado = datos.rfind(_CIERRE_CONSUMO)
+        if encontrado != -1:
+            return inicio + encontrado + len(_CIERRE_CONSUMO)
+        posicion = inicio
+    return 0
+
+
+def dividir_en_bloques(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Divide un XML de consumos en rangos de bytes que empiezan en un
+    '<consumo' y terminan justo antes del siguiente.
+    
+    Returns:
+        list: Tuplas (inicio, fin) en orden de archivo
+    """
+    tamano = os.path.getsize(ruta)
+    
+    with open(ruta, 'rb') as archivo:
+        fin = _buscar_ultimo_cierre(archivo, tamano)
+        inicio = _buscar_apertura(archivo, 0, fin)
+        
+        bloques = []
+        while inicio < fin:
+            siguiente = _buscar_apertura(archivo, min(inicio + tamano_bloque, fin), fin)
+            if siguiente <= inicio:
+                siguiente = fin
+            bloques.append((inicio, siguiente))
+            inicio = siguiente
+    
+    return bloques
+
+
+def _contexto_procesos():
+    """
+    Arranque de los workers. El servidor Flask tiene varios hilos y con
+    'fork' el hijo puede heredar un lock tomado por otro hilo (stdout, las
+    métricas) y quedarse bloqueado; 'forkserver' (o 'spawn' donde no
+    existe, como en Windows) parte de un proceso sin esos hilos.
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+
+def _procesar_bloque(ruta, inicio, fin):
+    """Parsea y valida los consumos de un rango de bytes (se ejecuta en un worker)."""
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        datos = archivo.read(fin - inicio)
+    
+    processor = XMLConsumoProcessor(b'<lote>' + datos + b'</lote>')
+    processor.procesar()
+    return processor.consumos
+
+
+class XMLConsumoProcessorParalelo:
+    """
+    Procesa un XML de consumos guardado en disco repartiendo bloques del
+    archivo entre varios procesos. Los resultados se entregan en el mismo
+    orden del archivo. El XML debe estar en UTF-8.
+    """
+    
+    def __init__(self, ruta, procesos=None, tamano_bloque=TAMANO_BLOQUE):
+        self.ruta = ruta
+        self.procesos = procesos or os.cpu_count() or 1
+        self.tamano_bloque = tamano_bloque
+        self.consumos = []
+        self.consumos_procesados = 0
+    
+    def iterar(self):
+        """
+        Yields:
+            tuple: (nit, id_instancia, consumo) por cada consumo válido
+        """
+        bloques = dividir_en_bloques(self.ruta, self.tamano_bloque)
+        
+        with ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto_procesos()) as executor:
+            # Se mantienen pocos bloques en vuelo para acotar la memoria
+            pendientes = deque()
+            for inicio, fin in bloques:
+                pendientes.append(executor.submit(_procesar_bloque, self.ruta, inicio, fin))
+                if len(pendientes) >= self.procesos * 2:
+                    yield from self._entregar(pendientes.popleft())
+            
+            while pendientes:
+                yield from self._entregar(pendientes.popleft())
+    
+    def _entregar(self, futuro):
+        consumos = futuro.result()
+        self.consumos_procesados += len(consumos)
+        return consumos
+    
+    def procesar(self):
+        """Procesa todos los consumos del archivo."""
+        self.consumos = list(self.iterar())
+        
+        return {
+            'consumos_procesados': len(self.consumos)
+        }
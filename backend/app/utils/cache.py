@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheResultados:
+    """
+    Caché LRU de resultados con tamaño máximo y tiempo de vida.
+    
+    La clave debe incluir la versión de los datos de los que depende el
+    resultado: al cambiar los datos cambia la clave, así que nunca se
+    devuelve un resultado viejo y las entradas anteriores salen solas por
+    LRU o por TTL. Los valores se comparten entre llamadas, quien los
+    recibe no debe modificarlos.
+    """
+    
+    def __init__(self, max_entradas=256, ttl=300.0):
+        """
+        Args:
+            max_entradas (int): Entradas antes de desalojar la menos usada
+            ttl (float): Segundos de vida de cada entrada
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()      # {clave: (expira, valor)}
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._desalojos = 0
+        self._expiradas = 0
+    
+    def obtener_o_calcular(self, clave, calcular):
+        """
+        Devuelve el resultado guardado para la clave o lo calcula y lo guarda.
+        
+        Args:
+            clave: Clave hashable (endpoint, parámetros normalizados, versión)
+            calcular: Función sin argumentos que produce el resultado
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if entrada[0] > ahora:
+                    self._entradas.move_to_end(clave)
+                    self._aciertos += 1
+                    return entrada[1]
+                del self._entradas[clave]
+                self._expiradas += 1
+            self._fallos += 1
+        
+        # Se calcula fuera del lock para no bloquear las consultas de otras claves
+        valor = calcular()
+        
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._desalojos += 1
+        
+        return valor
+    
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+    
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Entradas, límites y contadores de aciertos, fallos,
+                  desalojos por tamaño y entradas expiradas
+        """
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl_segundos': self.ttl,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'desalojos': self._desalojos,
+                'expiradas': self._expiradas,
+                'tasa_aciertos': round(self._aciertos / consultas, 4) if consultas else 0.0
+            }
@@ -0,0 +1,88 @@
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+
+# Extensiones aceptadas para los mensajes XML (planos o comprimidos)
+EXTENSIONES_XML = ('.xml', '.gz', '.xz', '.bz2')
+
+# Firmas (magic bytes) de los formatos de compresión soportados
+_FORMATOS = [
+    (b'\x1f\x8b', 'gzip', lambda flujo: gzip.GzipFile(fileobj=flujo, mode='rb')),
+    (b'\xfd7zXZ\x00', 'xz', lambda flujo: lzma.LZMAFile(flujo, mode='rb')),
+    (b'BZh', 'bz2', lambda flujo: bz2.BZ2File(flujo, mode='rb'))
+]
+_LARGO_FIRMA = max(len(firma) for firma, _, _ in _FORMATOS)
+
+
+class _FlujoConPrefijo(io.RawIOBase):
+    """Devuelve primero los bytes ya leídos y luego el resto del flujo original."""
+    
+    def __init__(self, prefijo, flujo):
+        self._prefijo = prefijo
+        self._flujo = flujo
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        if self._prefijo:
+            n = min(len(buffer), len(self._prefijo))
+            buffer[:n] = self._prefijo[:n]
+            self._prefijo = self._prefijo[n:]
+            return n
+        
+        datos = self._flujo.read(len(buffer))
+        buffer[:len(datos)] = datos
+        return len(datos)
+
+
+class FlujoConHuella(io.RawIOBase):
+    """
+    Calcula el SHA-256 de todo lo que se lee del flujo, para identificar un
+    archivo ya aplicado sin guardarlo completo.
+    """
+    
+    def __init__(self, flujo):
+        self._flujo = flujo
+        self._hash = hashlib.sha256()
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        datos = self._flujo.read(len(buffer))
+        buffer[:len(datos)] = datos
+        self._hash.update(datos)
+        return len(datos)
+    
+    def hexdigest(self):
+        """Huella de los bytes leídos hasta ahora (del archivo completo al llegar al final)."""
+        return self._hash.hexdigest()
+
+
+def es_archivo_xml(nombre):
+    """Valida que el nombre tenga una extensión de XML plano o comprimido."""
+    return bool(nombre) and nombre.lower().endswith(EXTENSIONES_XML)
+
+
+def abrir_flujo_xml(flujo):
+    """
+    Detecta por sus primeros bytes si el flujo viene comprimido con gzip,
+    xz o bz2 y lo envuelve para descomprimirlo a medida que se lee.
+    
+    Args:
+        flujo: Archivo binario abierto (p. ej. el stream de la petición)
+    
+    Returns:
+        tuple: (flujo con el XML sin comprimir, formato o None si es plano)
+    """
+    prefijo = flujo.read(_LARGO_FIRMA)
+    original = io.BufferedReader(_FlujoConPrefijo(prefijo, flujo))
+    
+    for firma, formato, abrir in _FORMATOS:
+        if prefijo.startswith(firma):
+            return io.BufferedReader(abrir(original)), formato
+    
+    return original, None
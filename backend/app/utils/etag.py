@@ -0,0 +1,45 @@
+import zlib
+from functools import wraps
+from flask import make_response, request
+from app.utils.ndjson import acepta_ndjson
+
+
+def condicional(obtener_version):
+    """
+    Decorador para rutas GET: emite un ETag armado con la versión de datos
+    y responde 304 si coincide con If-None-Match, sin ejecutar la ruta.
+    
+    La versión se lee antes de la ruta: si hay una escritura entre medio el
+    ETag queda más viejo que los datos y el cliente los vuelve a pedir una
+    vez de más, pero nunca se queda con datos desactualizados.
+    
+    Args:
+        obtener_version: Función sin argumentos que devuelve la versión actual
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            try:
+                etag = _etag(obtener_version())
+            except Exception:
+                # Sin versión (p. ej. archivo dañado) la ruta responde y reporta el error
+                return vista(*args, **kwargs)
+            
+            if request.if_none_match.contains_weak(etag):
+                respuesta = make_response('', 304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            
+            respuesta.set_etag(etag, weak=True)
+            respuesta.vary.add('Accept')
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def _etag(version):
+    # La misma versión da respuestas distintas según los parámetros y el formato
+    variante = f'{request.query_string.decode("latin-1")}|{acepta_ndjson()}'
+    return f'{version}-{zlib.crc32(variante.encode("utf-8")):08x}'
@@ -0,0 +1,104 @@
+from flask import jsonify, request
+
+# Elementos aceptados en una sola petición de carga por lote
+LOTE_MAXIMO = 10000
+
+
+def leer_lote():
+    """
+    Lee el cuerpo JSON de una petición de lote: un arreglo de objetos.
+    
+    Returns:
+        list: Elementos del lote
+    
+    Raises:
+        ValueError: Si el cuerpo no es un arreglo o supera LOTE_MAXIMO
+    """
+    elementos = request.get_json(silent=True)
+    if not isinstance(elementos, list) or not elementos:
+        raise ValueError('Se esperaba un arreglo JSON con al menos un elemento')
+    if len(elementos) > LOTE_MAXIMO:
+        raise ValueError(f'El lote no puede tener más de {LOTE_MAXIMO} elementos')
+    return elementos
+
+
+def campos_requeridos(datos, campos):
+    """Lanza ValueError con el primer campo que falte, como en las rutas individuales."""
+    for campo in campos:
+        if campo not in datos:
+            raise ValueError(f'Campo requerido faltante: {campo}')
+
+
+def validar_lote(elementos, convertir, clave, etiqueta, existentes=()):
+    """
+    Valida todos los elementos de un lote en una pasada.
+    
+    Args:
+        elementos (list): Datos recibidos
+        convertir: Función que arma el objeto desde un dict o lanza ValueError
+        clave: Función que devuelve la clave única del objeto
+        etiqueta (str): Cómo nombrar la clave en los mensajes, p. ej. 'Recurso con ID'
+        existentes: Claves que ya están guardadas (se rechazan)
+    
+    Returns:
+        tuple: (objetos válidos, resultados por elemento en el orden recibido)
+    """
+    objetos = []
+    resultados = []
+    vistos = set()
+    
+    for indice, datos in enumerate(elementos):
+        try:
+            if not isinstance(datos, dict):
+                raise ValueError('Cada elemento debe ser un objeto JSON')
+            objeto = convertir(datos)
+            id_objeto = clave(objeto)
+            if id_objeto in existentes:
+                raise ValueError(f'{etiqueta} {id_objeto} ya existe')
+            if id_objeto in vistos:
+                raise ValueError(f'{etiqueta} {id_objeto} aparece más de una vez en el lote')
+        except ValueError as e:
+            resultados.append({'indice': indice, 'success': False, 'message': str(e)})
+            continue
+        except (TypeError, AttributeError):
+            resultados.append({'indice': indice, 'success': False, 'message': 'Tipos de datos inválidos'})
+            continue
+        
+        vistos.add(id_objeto)
+        objetos.append(objeto)
+        resultados.append({'indice': indice, 'success': True, 'id': id_objeto})
+    
+    return objetos, resultados
+
+
+def marcar_existentes(resultados, existentes, etiqueta):
+    """
+    Marca como fallidos los elementos que el almacenamiento no insertó
+    porque ya existían (claves devueltas por guardar_lote con solo_nuevos).
+    """
+    existentes = set(existentes)
+    for resultado in resultados:
+        if resultado['success'] and str(resultado['id']) in existentes:
+            resultado['success'] = False
+            resultado['message'] = f'{etiqueta} {resultado.pop("id")} ya existe'
+
+
+def respuesta_lote(resultados, nombre):
+    """
+    Respuesta de un lote: 201 si se guardó todo, 207 si solo una parte y
+    400 si no se guardó ningún elemento.
+    
+    Args:
+        resultados (list): Resultados por elemento
+        nombre (str): Nombre en plural de lo que se creó, para el mensaje
+    """
+    creados = sum(1 for resultado in resultados if resultado['success'])
+    codigo = 201 if creados == len(resultados) else 207 if creados else 400
+    
+    return jsonify({
+        'success': creados > 0,
+        'message': f'Se crearon {creados} de {len(resultados)} {nombre}',
+        'data': resultados,
+        'creados': creados,
+        'errores': len(resultados) - creados
+    }), codigo
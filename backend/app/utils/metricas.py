@@ -0,0 +1,127 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+
+# Límites de los histogramas de duración, en segundos
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RegistroMetricas:
+    """
+    Contadores e histogramas en memoria, exportables en el formato de texto
+    de Prometheus. Cada proceso lleva los suyos: con varios workers cada uno
+    expone solo las peticiones que atendió.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas = {}     # {nombre: {tipo, ayuda, buckets, series: {etiquetas: valor}}}
+    
+    def contador(self, nombre, ayuda):
+        self._metricas[nombre] = {'tipo': 'counter', 'ayuda': ayuda, 'series': {}}
+    
+    def histograma(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+        self._metricas[nombre] = {'tipo': 'histogram', 'ayuda': ayuda, 'buckets': buckets, 'series': {}}
+    
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            series = self._metricas[nombre]['series']
+            series[clave] = series.get(clave, 0) + valor
+    
+    def observar(self, nombre, valor, **etiquetas):
+        """Agrega una observación al histograma (conteos por bucket, suma y total)."""
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            metrica = self._metricas[nombre]
+            serie = metrica['series'].get(clave)
+            if serie is None:
+                # Conteos por bucket (el último es +Inf) y suma
+                serie = metrica['series'][clave] = [[0] * (len(metrica['buckets']) + 1), 0.0]
+            serie[0][bisect_left(metrica['buckets'], valor)] += 1
+            serie[1] += valor
+    
+    def reiniciar(self):
+        with self._lock:
+            for metrica in self._metricas.values():
+                metrica['series'].clear()
+    
+    def exportar(self):
+        """
+        Returns:
+            str: Todas las métricas en formato de texto de Prometheus
+        """
+        lineas = []
+        with self._lock:
+            for nombre, metrica in self._metricas.items():
+                lineas.append(f'# HELP {nombre} {metrica["ayuda"]}')
+                lineas.append(f'# TYPE {nombre} {metrica["tipo"]}')
+                
+                for clave, valor in sorted(metrica['series'].items()):
+                    if metrica['tipo'] == 'counter':
+                        lineas.append(f'{nombre}{_etiquetas(clave)} {_numero(valor)}')
+                        continue
+                    
+                    conteos, suma = valor
+                    acumulado = 0
+                    for limite, conteo in zip(metrica['buckets'] + (float('inf'),), conteos):
+                        acumulado += conteo
+                        le = '+Inf' if limite == float('inf') else _numero(limite)
+                        lineas.append(f'{nombre}_bucket{_etiquetas(clave + (("le", le),))} {acumulado}')
+                    lineas.append(f'{nombre}_sum{_etiquetas(clave)} {_numero(suma)}')
+                    lineas.append(f'{nombre}_count{_etiquetas(clave)} {acumulado}')
+        
+        return '\n'.join(lineas) + '\n'
+
+
+def _etiquetas(clave):
+    if not clave:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in clave) + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+metricas = RegistroMetricas()
+metricas.histograma('http_peticion_duracion_segundos', 'Duración de las peticiones HTTP por ruta')
+metricas.contador('http_respuestas_total', 'Respuestas HTTP por ruta y código de estado')
+metricas.histograma('xml_parseo_segundos', 'Duración del parseo completo de data.xml')
+metricas.histograma('xml_serializacion_segundos', 'Duración de la serialización de data.xml al archivo temporal')
+metricas.histograma('xml_escritura_segundos', 'Duración del vaciado a disco del archivo temporal y el reemplazo de data.xml')
+metricas.contador('xml_bytes_leidos_total', 'Bytes de data.xml leídos, por modo (completo o streaming)')
+metricas.contador('xml_bytes_escritos_total', 'Bytes de data.xml escritos')
+
+
+def instalar_metricas(app):
+    """
+    Mide la duración y cuenta los códigos de estado de cada petición. Las
+    peticiones se agrupan por la regla de la ruta (/api/clientes/<nit>) y
+    no por la URL, así la cantidad de series no crece con los datos. En
+    las respuestas en streaming se mide hasta que empieza el envío.
+    
+    Args:
+        app: Aplicación Flask
+    """
+    @app.before_request
+    def iniciar_medicion():
+        g.inicio_peticion = time.perf_counter()
+    
+    @app.after_request
+    def registrar_medicion(respuesta):
+        inicio = g.pop('inicio_peticion', None)
+        if inicio is None:
+            return respuesta
+        
+        ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+        metricas.observar('http_peticion_duracion_segundos', time.perf_counter() - inicio,
+                          metodo=request.method, ruta=ruta)
+        metricas.incrementar('http_respuestas_total', metodo=request.method, ruta=ruta,
+                             codigo=str(respuesta.status_code))
+        return respuesta
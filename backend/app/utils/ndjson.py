@@ -0,0 +1,41 @@
+import json
+from flask import Response, request, stream_with_context
+
+TIPO_NDJSON = 'application/x-ndjson'
+
+
+def acepta_ndjson():
+    """Indica si el cliente pidió NDJSON en el encabezado Accept."""
+    return request.accept_mimetypes.best_match(['application/json', TIPO_NDJSON]) == TIPO_NDJSON
+
+
+def encabezados_pagina(total, siguiente):
+    """Total y siguiente cursor de una página, que en NDJSON van en encabezados."""
+    encabezados = {'X-Total-Count': str(total)}
+    if siguiente:
+        encabezados['X-Siguiente-Cursor'] = siguiente
+    return encabezados
+
+
+def respuesta_ndjson(registros, encabezados=None):
+    """
+    Respuesta en streaming con un objeto JSON compacto por línea.
+    
+    Los registros se serializan a medida que se envían, así el primer byte
+    sale de inmediato y la memoria no crece con el tamaño de la colección.
+    Si algo falla a mitad de camino ya no se puede cambiar el código HTTP,
+    por lo que el error se envía como última línea.
+    
+    Args:
+        registros: Iterable de diccionarios
+        encabezados (dict, optional): Encabezados adicionales
+    """
+    def generar():
+        try:
+            for registro in registros:
+                yield json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n'
+        except Exception as e:
+            yield json.dumps({'success': False, 'message': f'Error durante el streaming: {str(e)}'},
+                             ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generar()), mimetype=TIPO_NDJSON, headers=encabezados)
@@ -0,0 +1,204 @@
+import base64
+import heapq
+import json
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+# Tamaño de página cuando se pide ordenar o paginar sin indicar limit
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+
+class Paginacion:
+    """
+    Parámetros de paginación, orden y proyección de un listado.
+    
+    Si la petición no trae limit, offset, cursor ni sort la paginación no
+    está activa y el listado se devuelve completo en el orden del archivo.
+    """
+    
+    def __init__(self, orden, descendente=False, limite=None, desplazamiento=0,
+                 cursor=None, campos=None, activa=True):
+        self.orden = orden
+        self.descendente = descendente
+        self.limite = limite
+        self.desplazamiento = desplazamiento
+        self.cursor = cursor            # Clave (valor_orden, clave_primaria) del último elemento visto
+        self.campos = campos            # Set de campos a devolver o None para todos
+        self.activa = activa
+    
+    @staticmethod
+    def desde_argumentos(args, campos_orden, orden_defecto):
+        """
+        Lee limit, offset, cursor, sort y fields de los argumentos de la petición.
+        
+        Args:
+            args: request.args
+            campos_orden: Campos por los que se permite ordenar
+            orden_defecto: Campo de orden si no se indica sort (la clave primaria)
+        
+        Returns:
+            Paginacion: Parámetros validados
+        
+        Raises:
+            ValueError: Si algún parámetro es inválido
+        """
+        campos = None
+        if args.get('fields'):
+            campos = {campo.strip() for campo in args['fields'].split(',') if campo.strip()}
+        
+        activa = any(args.get(p) for p in ('limit', 'offset', 'cursor', 'sort'))
+        if not activa:
+            return Paginacion(orden_defecto, campos=campos, activa=False)
+        
+        orden = args.get('sort') or orden_defecto
+        descendente = orden.startswith('-')
+        orden = orden.lstrip('-')
+        if orden not in campos_orden:
+            raise ValueError(f"No se puede ordenar por '{orden}'. Use: {', '.join(campos_orden)}")
+        
+        try:
+            limite = int(args.get('limit', LIMITE_POR_DEFECTO))
+            desplazamiento = int(args.get('offset', 0))
+        except ValueError:
+            raise ValueError('limit y offset deben ser números enteros')
+        
+        if not 1 <= limite <= LIMITE_MAXIMO:
+            raise ValueError(f'limit debe estar entre 1 y {LIMITE_MAXIMO}')
+        if desplazamiento < 0:
+            raise ValueError('offset no puede ser negativo')
+        
+        cursor = None
+        if args.get('cursor'):
+            if desplazamiento:
+                raise ValueError('Use cursor u offset, no ambos')
+            cursor = decodificar_cursor(args['cursor'], orden, descendente)
+        
+        return Paginacion(orden, descendente, limite, desplazamiento, cursor, campos)
+    
+    def proyectar(self, datos):
+        """Deja solo los campos pedidos en fields (si se indicaron)."""
+        if self.campos is None:
+            return datos
+        return {campo: valor for campo, valor in datos.items() if campo in self.campos}
+    
+    def incluye(self, campo):
+        """Indica si un campo anidado (instancias, detalles...) debe armarse."""
+        return self.campos is None or campo in self.campos
+
+
+def codificar_cursor(orden, descendente, clave):
+    """Codifica la clave del último elemento de la página como texto opaco."""
+    datos = json.dumps({'o': orden, 'd': descendente, 'k': list(clave)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(texto, orden, descendente):
+    """
+    Lee un cursor y verifica que corresponda al orden pedido.
+    
+    Returns:
+        tuple: Clave (valor_orden, clave_primaria) del cursor
+    
+    Raises:
+        ValueError: Si el cursor es inválido o de otro orden
+    """
+    try:
+        relleno = '=' * (-len(texto) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(texto + relleno))
+        clave = tuple(datos['k'])
+        valido = datos['o'] == orden and datos['d'] == descendente and len(clave) == 2
+    except (ValueError, KeyError, TypeError):
+        valido = False
+    
+    if not valido:
+        raise ValueError('Cursor inválido o de un orden distinto al pedido')
+    return clave
+
+
+def paginar(entradas, paginacion):
+    """
+    Ordena y recorta una lista de entradas (clave, elemento), donde la
+    clave es (valor_orden, clave_primaria) y por lo tanto única.
+    
+    Con cursor la página empieza justo después de la clave del cursor
+    (keyset), así el resultado no se corre si se insertan elementos antes.
+    No se ordena la lista completa: se seleccionan con un heap solo las
+    entradas hasta el final de la página (más una para saber si hay más).
+    
+    Returns:
+        tuple: (elementos de la página, total de entradas, siguiente cursor o None)
+    """
+    total = len(entradas)
+    if not paginacion.activa:
+        return [elemento for _, elemento in entradas], total, None
+    
+    cursor = paginacion.cursor
+    saltar = 0 if cursor else paginacion.desplazamiento
+    seleccionar = heapq.nlargest if paginacion.descendente else heapq.nsmallest
+    
+    try:
+        if cursor and paginacion.descendente:
+            entradas = [entrada for entrada in entradas if entrada[0] < cursor]
+        elif cursor:
+            entradas = [entrada for entrada in entradas if entrada[0] > cursor]
+        seleccion = seleccionar(saltar + paginacion.limite + 1, entradas, key=itemgetter(0))
+    except TypeError:
+        # El cursor trae valores de otro tipo que las claves (p. ej. texto contra número)
+        raise ValueError('Cursor inválido o de un orden distinto al pedido')
+    
+    pagina = seleccion[saltar:saltar + paginacion.limite]
+    hay_mas = len(seleccion) > saltar + paginacion.limite
+    
+    siguiente = None
+    if hay_mas and pagina:
+        siguiente = codificar_cursor(paginacion.orden, paginacion.descendente, pagina[-1][0])
+    
+    return [elemento for _, elemento in pagina], total, siguiente
+
+
+def paginar_indice(claves, paginacion, inicio=0, fin=None):
+    """
+    Recorta una página de un índice ya ordenado de claves únicas
+    (valor_orden, clave_primaria) sin recorrerlo: los bordes de la página
+    se ubican con bisect dentro de claves[inicio:fin].
+    
+    Returns:
+        tuple: (claves de la página, total de claves en el rango, siguiente cursor o None)
+    """
+    fin = len(claves) if fin is None else fin
+    total = fin - inicio
+    limite = paginacion.limite
+    
+    try:
+        if not paginacion.descendente:
+            desde = (bisect_right(claves, paginacion.cursor, inicio, fin) if paginacion.cursor
+                     else inicio + paginacion.desplazamiento)
+            hasta = min(fin, desde + limite)
+            pagina = claves[desde:hasta]
+            hay_mas = hasta < fin
+        else:
+            hasta = (bisect_left(claves, paginacion.cursor, inicio, fin) if paginacion.cursor
+                     else fin - paginacion.desplazamiento)
+            desde = max(inicio, hasta - limite)
+            pagina = claves[desde:max(hasta, inicio)][::-1]
+            hay_mas = desde > inicio
+    except TypeError:
+        raise ValueError('Cursor inválido o de un orden distinto al pedido')
+    
+    siguiente = None
+    if hay_mas and pagina:
+        siguiente = codificar_cursor(paginacion.orden, paginacion.descendente, pagina[-1])
+    
+    return pagina, total, siguiente
+
+
+def metadatos_pagina(paginacion, total, siguiente):
+    """Bloque 'paginacion' que acompaña a los datos en la respuesta."""
+    return {
+        'limit': paginacion.limite,
+        'offset': paginacion.desplazamiento,
+        'sort': ('-' if paginacion.descendente else '') + paginacion.orden,
+        'total': total,
+        'siguiente_cursor': siguiente
+    }
@@ -0,0 +1,105 @@
+import cProfile
+import os
+import pstats
+import re
+import time
+import uuid
+from flask import g, request
+
+ENCABEZADO = 'X-Perfilar'
+PARAMETRO = 'perfilar'
+# Funciones que se resumen en el encabezado X-Perfil-Top (el resto va en el endpoint)
+TOP_ENCABEZADO = 5
+
+
+def instalar_perfilado(app, carpeta, token=None, top=20):
+    """
+    Perfila con cProfile las peticiones que traen el encabezado X-Perfilar
+    o el parámetro ?perfilar. Solo debe instalarse si la configuración lo
+    habilita; con `token` el valor enviado tiene que coincidir con él.
+    
+    El perfil se guarda como .prof en `carpeta` (se abre con pstats o
+    snakeviz) y la respuesta indica el archivo en X-Perfil junto con las
+    funciones de mayor tiempo acumulado en X-Perfil-Top.
+    
+    Args:
+        app: Aplicación Flask
+        carpeta (str): Carpeta donde se guardan los .prof
+        token (str, optional): Valor que debe traer la petición para perfilarse
+        top (int): Funciones que incluye el resumen
+    """
+    app.config['PERFILADO_CARPETA'] = carpeta
+    app.config['PERFILADO_TOP'] = top
+    
+    @app.before_request
+    def iniciar_perfil():
+        valor = request.headers.get(ENCABEZADO) or request.args.get(PARAMETRO)
+        if not valor or (token and valor != token):
+            return
+        
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Desde Python 3.12 solo puede haber un perfil activo a la vez en el proceso
+            g.perfil_error = 'Hay otro perfil en curso'
+            return
+        g.perfil = perfil
+    
+    @app.after_request
+    def guardar_perfil(respuesta):
+        if 'perfil_error' in g:
+            respuesta.headers['X-Perfil-Error'] = g.pop('perfil_error')
+        
+        perfil = g.pop('perfil', None)
+        if perfil is None:
+            return respuesta
+        
+        perfil.disable()
+        nombre = _nombre_archivo(request.endpoint)
+        os.makedirs(carpeta, exist_ok=True)
+        perfil.dump_stats(os.path.join(carpeta, nombre))
+        
+        resumen = resumir_perfil(perfil, TOP_ENCABEZADO)
+        respuesta.headers['X-Perfil'] = nombre
+        respuesta.headers['X-Perfil-Top'] = '; '.join(
+            f'{f["funcion"]} {f["acumulado_ms"]}ms' for f in resumen
+        ).encode('ascii', 'replace').decode('ascii')
+        return respuesta
+    
+    @app.teardown_request
+    def detener_perfil(error=None):
+        # Si la ruta lanzó una excepción no se pasa por after_request
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+
+
+def _nombre_archivo(endpoint):
+    instante = time.strftime('%Y%m%d-%H%M%S')
+    endpoint = re.sub(r'[^A-Za-z0-9_]', '_', endpoint or 'sin_ruta')
+    return f'{instante}_{endpoint}_{uuid.uuid4().hex[:8]}.prof'
+
+
+def resumir_perfil(origen, top):
+    """
+    Funciones con mayor tiempo acumulado de un perfil.
+    
+    Args:
+        origen: cProfile.Profile o ruta de un archivo .prof
+        top (int): Cantidad de funciones
+    
+    Returns:
+        list: [{funcion, llamadas, propio_ms, acumulado_ms}] de mayor a menor acumulado
+    """
+    estadisticas = pstats.Stats(origen).stats
+    filas = sorted(estadisticas.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            'funcion': f'{os.path.basename(archivo)}:{linea}({funcion})',
+            'llamadas': llamadas,
+            'propio_ms': round(propio * 1000, 3),
+            'acumulado_ms': round(acumulado * 1000, 3)
+        }
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in filas
+    ]
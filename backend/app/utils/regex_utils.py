@@ -1,31 +1,67 @@
 import re
-from datetime import datetime
+from functools import lru_cache
 
+# Patrones compilados una sola vez al importar el módulo
+_PATRON_FECHA = re.compile(r'\b(\d{2})/(\d{2})/(\d{4})\b')
+_PATRON_FECHA_HORA = re.compile(r'\b(\d{2})/(\d{2})/(\d{4})\s+(\d{2}):(\d{2})\b')
+_PATRON_NIT = re.compile(r'^\d+-[0-9K]$')
+
+_DIGITOS_VERIFICADORES = frozenset('0123456789K')
+_DIAS_POR_MES = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_HORAS = frozenset(f'{h:02d}' for h in range(24))
+_MINUTOS = frozenset(f'{m:02d}' for m in range(60))
+
+# Cantidad de fechas distintas que recuerda extraer_fecha
+TAMANO_CACHE = 4096
+
+
+def _es_fecha_valida(dia, mes, anio):
+    """Valida día, mes y año sin construir un datetime."""
+    if anio < 1 or not 1 <= mes <= 12 or dia < 1:
+        return False
+    if mes == 2 and anio % 4 == 0 and (anio % 100 != 0 or anio % 400 == 0):
+        return dia <= 29
+    return dia <= _DIAS_POR_MES[mes - 1]
+
+
+def _es_canonica(texto):
+    """Indica si el texto es exactamente dd/mm/yyyy con dígitos ASCII."""
+    if len(texto) != 10 or texto[2] != '/' or texto[5] != '/':
+        return False
+    digitos = texto[:2] + texto[3:5] + texto[6:]
+    return digitos.isascii() and digitos.isdigit()
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
 def extraer_fecha(texto):
     """
     Extrae la primera fecha válida en formato dd/mm/yyyy.
     
     Args:
         texto (str): Texto que puede contener una fecha
-        
+    
     Returns:
         str: Fecha en formato dd/mm/yyyy o None
     """
     if not texto:
         return None
     
-    patron = r'\b(\d{2})/(\d{2})/(\d{4})\b'
-    match = re.search(patron, texto)
+    # Camino rápido: el texto ya es solo la fecha
+    if _es_canonica(texto):
+        anio = int(texto[6:10])
+        if _es_fecha_valida(int(texto[:2]), int(texto[3:5]), anio):
+            return f"{texto[:6]}{anio}"
+        return None
+    
+    match = _PATRON_FECHA.search(texto)
     
     if match:
         dia, mes, anio = match.groups()
         dia, mes, anio = int(dia), int(mes), int(anio)
         
-        try:
-            datetime(anio, mes, dia)
+        if _es_fecha_valida(dia, mes, anio):
             return f"{dia:02d}/{mes:02d}/{anio}"
-        except ValueError:
-            return None
+        return None
     
     return None
 
@@ -40,16 +76,19 @@ def extraer_fecha_hora(texto):
     if not texto:
         return None
     
-    patron = r'\b(\d{2})/(\d{2})/(\d{4})\s+(\d{2}):(\d{2})\b'
-    match = re.search(patron, texto)
+    # Camino rápido: el texto ya es solo la fecha y la hora; la fecha se
+    # valida con extraer_fecha (que tiene caché) y la hora con búsquedas en sets
+    if (len(texto) == 16 and texto[10] == ' ' and texto[13] == ':'
+            and texto[11:13] in _HORAS and texto[14:16] in _MINUTOS):
+        return texto if extraer_fecha(texto[:10]) else None
+    
+    match = _PATRON_FECHA_HORA.search(texto)
     
     if match:
         dia, mes, anio, hora, minuto = match.groups()
-        try:
-            datetime(int(anio), int(mes), int(dia), int(hora), int(minuto))
+        if _es_fecha_valida(int(dia), int(mes), int(anio)) and int(hora) < 24 and int(minuto) < 60:
             return f"{dia}/{mes}/{anio} {hora}:{minuto}"
-        except ValueError:
-            return None
+        return None
     
     return None
 
@@ -64,5 +103,8 @@ def validar_nit(nit):
     if not nit:
         return False
     
-    patron = r'^\d+-[0-9K]$'
-    return bool(re.match(patron, nit))
\ No newline at end of file
+    # Camino rápido sin regex para el caso común
+    if len(nit) > 2 and nit[-2] == '-' and nit[-1] in _DIGITOS_VERIFICADORES and nit[:-2].isdecimal():
+        return True
+    
+    return bool(_PATRON_NIT.match(nit))
@@ -0,0 +1,81 @@
+import gzip
+import json
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = ('application/json', 'application/xml', 'text/')
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Serializa las respuestas JSON en forma compacta y en UTF-8, con orjson
+    si está instalado. Los tipos que el codificador no conoce (Decimal,
+    fechas, UUID...) se convierten igual que en el proveedor de Flask.
+    """
+    
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self._serializar(obj).decode('utf-8')
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._serializar(obj) + b'\n', mimetype=self.mimetype)
+    
+    def _serializar(self, obj):
+        """Devuelve los bytes UTF-8 del JSON compacto."""
+        if orjson is not None:
+            opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            if self.sort_keys:
+                opciones |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=self.default, option=opciones)
+        
+        return json.dumps(obj, default=self.default, ensure_ascii=self.ensure_ascii,
+                          sort_keys=self.sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def instalar_compresion(app, minimo_bytes=1024, nivel=6):
+    """
+    Comprime con gzip las respuestas de al menos `minimo_bytes` cuando el
+    cliente lo acepta. Las respuestas en streaming (NDJSON, archivos) se
+    envían tal cual para no tener que armarlas completas en memoria.
+    
+    Args:
+        app: Aplicación Flask
+        minimo_bytes (int): Tamaño desde el que se comprime
+        nivel (int): Nivel de gzip (1 = más rápido, 9 = más pequeño)
+    """
+    @app.after_request
+    def comprimir(respuesta):
+        respuesta.vary.add('Accept-Encoding')
+        
+        if (respuesta.status_code < 200 or respuesta.status_code in (204, 304)
+                or respuesta.direct_passthrough or respuesta.is_streamed
+                or 'Content-Encoding' in respuesta.headers
+                or not (respuesta.mimetype or '').startswith(TIPOS_COMPRIMIBLES)
+                or not request.accept_encodings['gzip']):
+            return respuesta
+        
+        datos = respuesta.get_data()
+        if len(datos) < minimo_bytes:
+            return respuesta
+        
+        # mtime fijo para que el mismo contenido produzca los mismos bytes
+        respuesta.set_data(gzip.compress(datos, compresslevel=nivel, mtime=0))
+        respuesta.headers['Content-Encoding'] = 'gzip'
+        return respuesta
+    
+    return comprimir
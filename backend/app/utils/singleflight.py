@@ -0,0 +1,72 @@
+import threading
+
+
+class _Vuelo:
+    """Cálculo en curso para una clave."""
+    
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class GrupoVuelos:
+    """
+    Une llamadas concurrentes con la misma clave (singleflight): la primera
+    ejecuta el cálculo y las que llegan mientras tanto esperan y reciben el
+    mismo resultado, o la misma excepción. Al terminar la clave se libera,
+    así que no guarda resultados; para eso está CacheResultados.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso = {}     # {clave: _Vuelo}
+        self._ejecutadas = 0
+        self._compartidas = 0
+    
+    def hacer(self, clave, funcion):
+        """
+        Ejecuta la función o espera a la que ya está en curso con la misma clave.
+        
+        Args:
+            clave: Clave hashable; debe incluir la versión de los datos para
+                no unirse a un cálculo que empezó antes de una escritura
+            funcion: Función sin argumentos que produce el resultado
+        """
+        with self._lock:
+            vuelo = self._en_curso.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_curso[clave] = _Vuelo()
+                self._ejecutadas += 1
+            else:
+                self._compartidas += 1
+        
+        if not lider:
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+        
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+            vuelo.listo.set()
+    
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Cálculos en curso, ejecutados y llamadas que se unieron a uno en curso
+        """
+        with self._lock:
+            return {
+                'en_curso': len(self._en_curso),
+                'ejecutadas': self._ejecutadas,
+                'compartidas': self._compartidas
+            }
@@ -0,0 +1,245 @@
+# [file name]: benchmarks/bench_almacenamiento.py
+"""
+Mide cada operación de XMLManager (lectura puntual, listado, alta,
+actualización, baja y siguiente número de factura) con almacenes de
+distintos tamaños y reporta operaciones por segundo, latencia p50/p99 y
+el pico de memoria (RSS) en JSON.
+
+Un tamaño N significa N recursos, N clientes (una instancia cada uno) y
+N/10 facturas. Cada tamaño se mide en un proceso aparte para que el pico
+de memoria sea el de ese tamaño. Por defecto se miden 1000, 10000 y
+100000; el millón se agrega con --incluir-millon porque construirlo y
+medirlo tarda horas y necesita cerca de 14 GiB de memoria (100000
+registros ya llegan a ~1,4 GiB).
+
+Con --baseline el resultado se compara contra una corrida guardada y el
+comando termina con código 1 si la latencia p50 de alguna operación sube
+más del umbral. La baseline depende de la máquina: conviene generarla
+con --guardar-baseline en la misma máquina donde se hace la comparación.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_almacenamiento --tamanos 1000 10000 100000
+    python -m benchmarks.bench_almacenamiento --incluir-millon
+    python -m benchmarks.bench_almacenamiento --baseline benchmarks/baseline_almacenamiento.json
+    python -m benchmarks.bench_almacenamiento --tamanos 1000 --guardar-baseline benchmarks/baseline_almacenamiento.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.database.xml_manager import XMLManager
+from app.models import Recurso, Factura, DetalleFactura
+from app.services.xml_procesor import XMLConfigProcessor
+from benchmarks.generador_datos import escribir_configuracion, nit_cliente
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TAMANOS = (1000, 10000, 100000)
+# Solo con --incluir-millon
+TAMANO_MILLON = 1000000
+UMBRAL = 0.25
+# Por debajo de esta latencia el ruido de medición supera cualquier diferencia real
+MINIMO_MS = 1.0
+
+
+def pico_rss_mib():
+    """Pico de memoria residente del proceso en MiB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB y macOS bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentil(valores_ordenados, p):
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+
+def construir_almacen(ruta, tamano, semilla):
+    """Crea data.xml con `tamano` recursos y clientes y tamano/10 facturas."""
+    xml = io.StringIO()
+    escribir_configuracion(xml, recursos=tamano, clientes=tamano, instancias_por_cliente=1, semilla=semilla)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor = XMLConfigProcessor(xml.getvalue())
+        processor.procesar()
+
+    manager = XMLManager(archivo=ruta)
+    manager.guardar_lote(processor.recursos, processor.categorias, processor.clientes)
+
+    # Las facturas se agregan en una sola escritura (guardar_factura reescribe el archivo en cada una)
+    tree, metadatos = manager._cargar()
+    facturas_node = tree.getroot().find('facturas')
+    for numero in range(1, tamano // 10 + 1):
+        factura = nueva_factura(numero, tamano)
+        facturas_node.append(factura.to_xml_element())
+        metadatos.registrar_factura(factura)
+    manager._escribir(tree, metadatos)
+
+    return manager
+
+
+def nueva_factura(numero, tamano):
+    indice = numero % tamano
+    factura = Factura(numero, nit_cliente(indice), f'{1 + numero % 28:02d}/{1 + numero % 12:02d}/2024')
+    factura.agregar_detalle(DetalleFactura(indice + 1, f'instancia-{indice}-0', 10.0, 25.0, 1, 1))
+    return factura
+
+
+def operaciones(tamano):
+    """
+    Operaciones a medir. Cada una recibe el manager y el número de
+    repetición, para que las que insertan usen ids nuevos.
+    """
+    aleatorio = random.Random(tamano)
+
+    def recurso(id_recurso):
+        return Recurso(id_recurso, f'Recurso {id_recurso}', f'R{id_recurso}', 'GiB', 'Hardware',
+                       round(aleatorio.uniform(0.05, 5.0), 2))
+
+    return [
+        ('obtener_recurso_por_id', lambda m, i: m.obtener_recurso_por_id(aleatorio.randint(1, tamano))),
+        ('obtener_cliente_por_nit', lambda m, i: m.obtener_cliente_por_nit(nit_cliente(aleatorio.randrange(tamano)))),
+        ('obtener_factura_por_numero', lambda m, i: m.obtener_factura_por_numero(aleatorio.randint(1, max(tamano // 10, 1)))),
+        ('obtener_recursos', lambda m, i: m.obtener_recursos()),
+        ('obtener_clientes', lambda m, i: m.obtener_clientes()),
+        ('obtener_siguiente_numero_factura', lambda m, i: m.obtener_siguiente_numero_factura()),
+        ('guardar_recurso_actualizar', lambda m, i: m.guardar_recurso(recurso(aleatorio.randint(1, tamano)))),
+        ('guardar_recurso_insertar', lambda m, i: m.guardar_recurso(recurso(tamano + 1 + i))),
+        ('eliminar_recurso', lambda m, i: m.eliminar_recurso(tamano + 1 + i)),
+        # Incluye la lectura del cliente, como hace el servicio al agregarle una instancia
+        ('obtener_y_guardar_cliente', lambda m, i: m.guardar_cliente(
+            m.obtener_cliente_por_nit(nit_cliente(aleatorio.randrange(tamano))))),
+        ('guardar_factura', lambda m, i: m.guardar_factura(nueva_factura(m.obtener_siguiente_numero_factura(), tamano)))
+    ]
+
+
+def medir_tamano(tamano, repeticiones, semilla):
+    """Construye un almacén de `tamano` registros y mide cada operación."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'data.xml')
+
+        inicio = time.perf_counter()
+        manager = construir_almacen(ruta, tamano, semilla)
+        resultado = {
+            'tamano': tamano,
+            'bytes': os.path.getsize(ruta),
+            'construccion_segundos': round(time.perf_counter() - inicio, 3),
+            'repeticiones': repeticiones,
+            'operaciones': {}
+        }
+
+        for nombre, operacion in operaciones(tamano):
+            latencias = []
+            for i in range(repeticiones):
+                inicio = time.perf_counter()
+                operacion(manager, i)
+                latencias.append(time.perf_counter() - inicio)
+
+            latencias.sort()
+            resultado['operaciones'][nombre] = {
+                'ops_por_segundo': round(len(latencias) / sum(latencias), 2),
+                'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+                'p99_ms': round(percentil(latencias, 99) * 1000, 3)
+            }
+
+        resultado['pico_rss_mib'] = pico_rss_mib()
+        return resultado
+
+
+def comparar(resultados, baseline, umbral, minimo_ms=MINIMO_MS):
+    """
+    Lista las operaciones cuya latencia p50 subió más de `umbral` respecto
+    a la baseline (la mediana es menos sensible al ruido que el promedio).
+    Solo se comparan los tamaños y operaciones presentes en ambas, y se
+    ignoran las que siguen por debajo de `minimo_ms`.
+    """
+    referencia = {r['tamano']: r['operaciones'] for r in baseline['resultados']}
+    regresiones = []
+
+    for resultado in resultados:
+        anteriores = referencia.get(resultado['tamano'], {})
+        for nombre, actual in resultado['operaciones'].items():
+            if nombre not in anteriores:
+                continue
+            esperado = anteriores[nombre]['p50_ms']
+            if max(actual['p50_ms'], esperado) < minimo_ms:
+                continue
+            if actual['p50_ms'] > esperado * (1 + umbral):
+                regresiones.append({
+                    'tamano': resultado['tamano'],
+                    'operacion': nombre,
+                    'baseline_p50_ms': esperado,
+                    'p50_ms': actual['p50_ms'],
+                    'variacion': round(actual['p50_ms'] / esperado - 1, 3)
+                })
+
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=list(TAMANOS))
+    parser.add_argument('--incluir-millon', action='store_true',
+                        help=f'Mide también {TAMANO_MILLON} registros (tarda horas)')
+    parser.add_argument('--repeticiones', type=int,
+                        help='Repeticiones por operación (por defecto depende del tamaño)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--baseline', help='JSON de una corrida anterior para detectar regresiones')
+    parser.add_argument('--umbral', type=float, default=UMBRAL,
+                        help='Aumento de la latencia p50 tolerado respecto a la baseline (0.25 = 25%%)')
+    parser.add_argument('--minimo-ms', type=float, default=MINIMO_MS,
+                        help='Operaciones con p50 menor a esto no se comparan')
+    parser.add_argument('--guardar-baseline', help='Guarda el resultado como nueva baseline')
+    args = parser.parse_args()
+
+    tamanos = list(args.tamanos)
+    if args.incluir_millon and TAMANO_MILLON not in tamanos:
+        tamanos.append(TAMANO_MILLON)
+
+    resultados = []
+    for tamano in tamanos:
+        repeticiones = args.repeticiones or max(3, min(100, 100000 // tamano))
+        # Un proceso nuevo por tamaño para medir su pico de memoria por separado
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            resultados.append(executor.submit(medir_tamano, tamano, repeticiones, args.semilla).result())
+
+    salida = {
+        'plataforma': {
+            'python': platform.python_version(),
+            'sistema': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'resultados': resultados
+    }
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as archivo:
+            salida['regresiones'] = comparar(resultados, json.load(archivo), args.umbral, args.minimo_ms)
+
+    if args.guardar_baseline:
+        with open(args.guardar_baseline, 'w', encoding='utf-8') as archivo:
+            json.dump(salida, archivo, indent=2)
+            archivo.write('\n')
+
+    print(json.dumps(salida, indent=2))
+
+    if salida.get('regresiones'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+# [file name]: benchmarks/bench_facturacion.py
+"""
+Mide la facturación de punta a punta sobre un almacén de N clientes x M
+instancias x K consumos por instancia armado con el generador de datos.
+
+Para cada operación del servicio (generar_facturas, análisis por
+categoría y por recurso, consumos pendientes) se separa el tiempo en:
+    carga:       lectura y parseo de data.xml y de sus metadatos
+    persistencia: serialización y escritura de data.xml
+    cálculo:     el resto (lógica del servicio y armado del árbol en memoria)
+
+Las consultas se miden en frío (sin los metadatos en memoria, como en un
+proceso recién iniciado) y en caliente. En ambos casos se vacía antes la
+caché de resultados del servicio, así se mide el cálculo; los análisis se
+miden además repetidos sin vaciarla (sufijo _cache), que es un acierto.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_facturacion --clientes 100 1000 --instancias 3 --consumos-por-instancia 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.database import xml_manager as modulo_xml_manager
+from app.database.xml_manager import XMLManager
+from app.services.facturacion_service import FacturacionService
+from app.services.xml_procesor import XMLConfigProcessor, XMLConsumoProcessor
+from benchmarks.bench_almacenamiento import pico_rss_mib
+from benchmarks.generador_datos import escribir_configuracion, escribir_consumos
+
+FECHA_INICIO = datetime(2024, 1, 1)
+
+
+class XMLManagerInstrumentado(XMLManager):
+    """
+    XMLManager que acumula el tiempo de carga y de persistencia. Solo se
+    cuenta la llamada más externa, así una lectura que internamente carga
+    los metadatos no se suma dos veces.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._profundidad = 0
+        self.reiniciar()
+        super().__init__(*args, **kwargs)
+
+    def reiniciar(self):
+        self.tiempos = {'carga': 0.0, 'persistencia': 0.0}
+        self.llamadas = {'carga': 0, 'persistencia': 0}
+
+    def _medir(self, fase, metodo, *args, **kwargs):
+        if self._profundidad:
+            return metodo(*args, **kwargs)
+
+        self._profundidad += 1
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            self.tiempos[fase] += time.perf_counter() - inicio
+            self.llamadas[fase] += 1
+            self._profundidad -= 1
+
+    def _cargar(self):
+        return self._medir('carga', super()._cargar)
+
+    def _metadatos(self, root=None):
+        return self._medir('carga', super()._metadatos, root)
+
+    def _escribir(self, tree, metadatos):
+        return self._medir('persistencia', super()._escribir, tree, metadatos)
+
+
+# Todas las lecturas públicas cuentan como carga
+for _nombre in dir(XMLManager):
+    if _nombre.startswith('obtener_'):
+        setattr(
+            XMLManagerInstrumentado, _nombre,
+            (lambda nombre: lambda self, *args, **kwargs: self._medir(
+                'carga', getattr(super(XMLManagerInstrumentado, self), nombre), *args, **kwargs
+            ))(_nombre)
+        )
+
+
+def construir_almacen(ruta, clientes, instancias, consumos_por_instancia, dias, semilla):
+    """Carga la configuración y los consumos generados como lo harían los endpoints."""
+    config = io.StringIO()
+    escribir_configuracion(config, clientes=clientes, instancias_por_cliente=instancias,
+                           canceladas=0.0, dias=dias, semilla=semilla)
+    consumos = io.StringIO()
+    escribir_consumos(consumos, consumos=clientes * instancias * consumos_por_instancia,
+                      clientes=clientes, instancias_por_cliente=instancias, dias=dias, semilla=semilla)
+
+    manager = XMLManager(archivo=ruta)
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor = XMLConfigProcessor(config.getvalue())
+        processor.procesar()
+        manager.guardar_lote(processor.recursos, processor.categorias, processor.clientes)
+        manager.guardar_consumos(XMLConsumoProcessor(consumos.getvalue()).iterar())
+
+
+def medir(manager, operacion, frio, cache=None):
+    """
+    Ejecuta la operación y devuelve sus tiempos por fase en segundos. Con
+    `cache` (la CacheResultados del servicio) la vacía antes de medir.
+    """
+    if frio:
+        modulo_xml_manager._cache_metadatos.clear()
+    if cache is not None:
+        cache.limpiar()
+    manager.reiniciar()
+
+    inicio = time.perf_counter()
+    resultado = operacion()
+    total = time.perf_counter() - inicio
+
+    carga = manager.tiempos['carga']
+    persistencia = manager.tiempos['persistencia']
+    return resultado, {
+        'total': round(total, 4),
+        'carga': round(carga, 4),
+        'calculo': round(total - carga - persistencia, 4),
+        'persistencia': round(persistencia, 4),
+        'lecturas': manager.llamadas['carga'],
+        'escrituras': manager.llamadas['persistencia']
+    }
+
+
+def medir_escenario(clientes, instancias, consumos_por_instancia, dias, semilla):
+    fecha_inicio = FECHA_INICIO.strftime('%d/%m/%Y')
+    fecha_fin = (FECHA_INICIO + timedelta(days=dias)).strftime('%d/%m/%Y')
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'data.xml')
+
+        inicio = time.perf_counter()
+        construir_almacen(ruta, clientes, instancias, consumos_por_instancia, dias, semilla)
+        resultado = {
+            'clientes': clientes,
+            'instancias_por_cliente': instancias,
+            'consumos_por_instancia': consumos_por_instancia,
+            'construccion_segundos': round(time.perf_counter() - inicio, 3),
+            'bytes_antes': os.path.getsize(ruta),
+            'operaciones': {}
+        }
+
+        manager = XMLManagerInstrumentado(archivo=ruta)
+        service = FacturacionService(manager)
+        operaciones = resultado['operaciones']
+
+        for frio in (True, False):
+            _, operaciones[f'obtener_consumos_pendientes_{"frio" if frio else "caliente"}'] = medir(
+                manager, service.obtener_consumos_pendientes, frio, service.cache)
+
+        facturas, operaciones['generar_facturas'] = medir(
+            manager, lambda: service.generar_facturas(fecha_inicio, fecha_fin), frio=True, cache=service.cache)
+        resultado['facturas_generadas'] = len(facturas)
+
+        for frio in (True, False):
+            sufijo = 'frio' if frio else 'caliente'
+            _, operaciones[f'analizar_ventas_por_categoria_{sufijo}'] = medir(
+                manager, lambda: service.analizar_ventas_por_categoria(fecha_inicio, fecha_fin), frio, service.cache)
+            _, operaciones[f'analizar_ventas_por_recurso_{sufijo}'] = medir(
+                manager, lambda: service.analizar_ventas_por_recurso(fecha_inicio, fecha_fin), frio, service.cache)
+
+        # Repetidas sin vaciar la caché, que quedó con el resultado en caliente: un acierto
+        _, operaciones['analizar_ventas_por_categoria_cache'] = medir(
+            manager, lambda: service.analizar_ventas_por_categoria(fecha_inicio, fecha_fin), frio=False)
+        _, operaciones['analizar_ventas_por_recurso_cache'] = medir(
+            manager, lambda: service.analizar_ventas_por_recurso(fecha_inicio, fecha_fin), frio=False)
+
+        resultado['bytes_despues'] = os.path.getsize(ruta)
+
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, nargs='+', default=[100],
+                        help='Uno o varios N para ver cómo escala')
+    parser.add_argument('--instancias', type=int, default=3, help='M instancias por cliente')
+    parser.add_argument('--consumos-por-instancia', type=int, default=20, help='K consumos por instancia')
+    parser.add_argument('--dias', type=int, default=30, help='Días del período facturado')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    resultados = [
+        medir_escenario(clientes, args.instancias, args.consumos_por_instancia, args.dias, args.semilla)
+        for clientes in args.clientes
+    ]
+
+    print(json.dumps({'resultados': resultados, 'pico_rss_mib': pico_rss_mib()}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
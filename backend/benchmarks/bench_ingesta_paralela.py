@@ -0,0 +1,81 @@
+# [file name]: benchmarks/bench_ingesta_paralela.py
+"""
+Compara la ingesta secuencial de un XML de consumos contra la ingesta
+paralela por bloques con distinta cantidad de procesos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_ingesta_paralela --consumos 1000000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from app.services.xml_procesor import XMLConsumoProcessor, XMLConsumoProcessorParalelo
+
+
+def escribir_consumos(ruta, cantidad):
+    """Escribe un XML de consumos sintético con `cantidad` registros."""
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        archivo.write('<?xml version="1.0" encoding="utf-8"?>\n<listadoConsumos>\n')
+        for i in range(cantidad):
+            archivo.write(
+                f'  <consumo nitCliente="{1000 + i % 500}-{i % 10}" idInstancia="{i % 2000}">\n'
+                f'    <tiempo>{(i % 97) / 4}</tiempo>\n'
+                f'    <fechaHora>Guatemala, {1 + i % 28:02d}/{1 + i % 12:02d}/2024 {i % 24:02d}:{i % 60:02d}</fechaHora>\n'
+                f'  </consumo>\n'
+            )
+        archivo.write('</listadoConsumos>\n')
+
+
+def medir(processor):
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        total = sum(1 for _ in processor.iterar())
+    return time.perf_counter() - inicio, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--consumos', type=int, default=200000)
+    parser.add_argument('--procesos', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--tamano-bloque', type=int, default=4 * 1024 * 1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'consumos.xml')
+        escribir_consumos(ruta, args.consumos)
+
+        with open(ruta, 'rb') as archivo:
+            segundos, total = medir(XMLConsumoProcessor(archivo))
+
+        resultado = {
+            'consumos': args.consumos,
+            'bytes': os.path.getsize(ruta),
+            'cpus': os.cpu_count(),
+            'secuencial': {'segundos': round(segundos, 3), 'consumos_por_segundo': round(total / segundos)},
+            'paralelo': []
+        }
+
+        for procesos in args.procesos:
+            processor = XMLConsumoProcessorParalelo(ruta, procesos=procesos, tamano_bloque=args.tamano_bloque)
+            segundos_par, total_par = medir(processor)
+            if total_par != total:
+                raise SystemExit(f'La ingesta paralela devolvió {total_par} consumos en lugar de {total}')
+
+            resultado['paralelo'].append({
+                'procesos': procesos,
+                'segundos': round(segundos_par, 3),
+                'consumos_por_segundo': round(total_par / segundos_par),
+                'aceleracion': round(segundos / segundos_par, 2)
+            })
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
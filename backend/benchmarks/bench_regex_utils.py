@@ -0,0 +1,128 @@
+# [file name]: benchmarks/bench_regex_utils.py
+"""
+Mide el throughput de los parsers de regex_utils contra la versión que
+recompila el patrón y construye un datetime en cada llamada.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_regex_utils --registros 1000000
+"""
+import argparse
+import json
+import random
+import re
+import time
+from datetime import datetime
+
+from app.utils import regex_utils
+
+
+# Versión anterior de los parsers, como referencia
+def referencia_extraer_fecha(texto):
+    if not texto:
+        return None
+    match = re.search(r'\b(\d{2})/(\d{2})/(\d{4})\b', texto)
+    if match:
+        dia, mes, anio = (int(g) for g in match.groups())
+        try:
+            datetime(anio, mes, dia)
+            return f"{dia:02d}/{mes:02d}/{anio}"
+        except ValueError:
+            return None
+    return None
+
+
+def referencia_extraer_fecha_hora(texto):
+    if not texto:
+        return None
+    match = re.search(r'\b(\d{2})/(\d{2})/(\d{4})\s+(\d{2}):(\d{2})\b', texto)
+    if match:
+        dia, mes, anio, hora, minuto = match.groups()
+        try:
+            datetime(int(anio), int(mes), int(dia), int(hora), int(minuto))
+            return f"{dia}/{mes}/{anio} {hora}:{minuto}"
+        except ValueError:
+            return None
+    return None
+
+
+def referencia_validar_nit(nit):
+    if not nit:
+        return False
+    return bool(re.match(r'^\d+-[0-9K]$', nit))
+
+
+def generar_registros(cantidad, dias_distintos, semilla):
+    """
+    Genera textos como los de un XML de consumos: la mitad con prefijo de
+    lugar (camino con regex) y la mitad canónicos (camino rápido).
+    """
+    aleatorio = random.Random(semilla)
+    fechas = [
+        f'{1 + d % 28:02d}/{1 + (d // 28) % 12:02d}/{2020 + d // 336}'
+        for d in range(dias_distintos)
+    ]
+    registros = []
+    for i in range(cantidad):
+        fecha = aleatorio.choice(fechas)
+        fecha_hora = f'{fecha} {aleatorio.randrange(24):02d}:{aleatorio.randrange(60):02d}'
+        if i % 2:
+            fecha = f'Guatemala, {fecha}'
+            fecha_hora = f'Guatemala, {fecha_hora}'
+        nit = f'{aleatorio.randrange(10 ** 4, 10 ** 9)}-{aleatorio.choice("0123456789K")}'
+        registros.append((fecha, fecha_hora, nit))
+    return registros
+
+
+def medir(funcion, textos):
+    inicio = time.perf_counter()
+    for texto in textos:
+        funcion(texto)
+    segundos = time.perf_counter() - inicio
+    return {'segundos': round(segundos, 3), 'por_segundo': round(len(textos) / segundos)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=1000000)
+    parser.add_argument('--dias-distintos', type=int, default=730)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    registros = generar_registros(args.registros, args.dias_distintos, args.semilla)
+    columnas = {
+        'extraer_fecha': [r[0] for r in registros],
+        'extraer_fecha_hora': [r[1] for r in registros],
+        'validar_nit': [r[2] for r in registros]
+    }
+    referencias = {
+        'extraer_fecha': referencia_extraer_fecha,
+        'extraer_fecha_hora': referencia_extraer_fecha_hora,
+        'validar_nit': referencia_validar_nit
+    }
+
+    resultado = {'registros': args.registros, 'funciones': {}}
+    for nombre, textos in columnas.items():
+        funcion = getattr(regex_utils, nombre)
+        if hasattr(funcion, 'cache_clear'):
+            funcion.cache_clear()
+
+        for texto in textos[:10000]:
+            if funcion(texto) != referencias[nombre](texto):
+                raise SystemExit(f'{nombre} difiere de la referencia para {texto!r}')
+
+        antes = medir(referencias[nombre], textos)
+        despues = medir(funcion, textos)
+        resultado['funciones'][nombre] = {
+            'referencia': antes,
+            'actual': despues,
+            'aceleracion': round(antes['segundos'] / despues['segundos'], 2)
+        }
+        if hasattr(funcion, 'cache_info'):
+            info = funcion.cache_info()
+            resultado['funciones'][nombre]['cache'] = {'aciertos': info.hits, 'fallos': info.misses}
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# [file name]: benchmarks/bench_respuestas.py
+"""
+Compara el tamaño y el tiempo de codificación de respuestas JSON grandes
+(listado de clientes con sus instancias y listado de facturas):
+
+    stdlib_indentado: como respondía create_app antes (indent=2, claves ordenadas)
+    stdlib_compacto:  ProveedorJSON sin orjson
+    orjson:           ProveedorJSON con orjson (si está instalado)
+
+Sobre el JSON compacto se mide además gzip en varios niveles: bytes y
+tiempo de compresión.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_respuestas --clientes 1000 10000 --facturas 10000
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import time
+
+from flask import Flask
+
+from app.services.xml_procesor import XMLConfigProcessor
+from app.utils import respuestas
+from app.utils.respuestas import ProveedorJSON
+from benchmarks.bench_almacenamiento import nueva_factura, percentil, pico_rss_mib
+from benchmarks.generador_datos import escribir_configuracion
+
+NIVELES_GZIP = (1, 6, 9)
+
+
+def construir_cargas(clientes, facturas, semilla):
+    """Arma los cuerpos de respuesta tal como los devuelven las rutas de listado."""
+    xml = io.StringIO()
+    escribir_configuracion(xml, clientes=clientes, instancias_por_cliente=3, semilla=semilla)
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor = XMLConfigProcessor(xml.getvalue())
+        processor.procesar()
+
+    lista_clientes = [cliente.to_dict() for cliente in processor.clientes]
+    lista_facturas = [nueva_factura(numero, clientes).to_dict() for numero in range(1, facturas + 1)]
+    return {
+        'clientes': {'success': True, 'data': lista_clientes, 'total': len(lista_clientes)},
+        'facturas': {'success': True, 'data': lista_facturas, 'total': len(lista_facturas)}
+    }
+
+
+def codificadores():
+    """Codificadores a comparar: {nombre: función(obj) -> bytes}."""
+    proveedor = ProveedorJSON(Flask(__name__))
+    resultado = {
+        'stdlib_indentado': lambda obj: json.dumps(obj, indent=2, sort_keys=True,
+                                                   default=proveedor.default).encode('utf-8')
+    }
+
+    def sin_orjson(obj):
+        original, respuestas.orjson = respuestas.orjson, None
+        try:
+            return proveedor._serializar(obj)
+        finally:
+            respuestas.orjson = original
+
+    resultado['stdlib_compacto'] = sin_orjson
+    if respuestas.orjson is not None:
+        resultado['orjson'] = proveedor._serializar
+    return resultado
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta la función varias veces y devuelve (último resultado, p50 en ms)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return salida, round(percentil(tiempos, 50) * 1000, 3)
+
+
+def medir_carga(carga, repeticiones):
+    resultado = {'codificacion': {}, 'gzip': {}}
+
+    compacto = None
+    for nombre, codificar in codificadores().items():
+        datos, p50_ms = medir(lambda: codificar(carga), repeticiones)
+        resultado['codificacion'][nombre] = {'bytes': len(datos), 'p50_ms': p50_ms}
+        if nombre != 'stdlib_indentado':
+            compacto = datos
+
+    for nivel in NIVELES_GZIP:
+        comprimido, p50_ms = medir(lambda: gzip.compress(compacto, compresslevel=nivel, mtime=0), repeticiones)
+        resultado['gzip'][f'nivel_{nivel}'] = {
+            'bytes': len(comprimido),
+            'p50_ms': p50_ms,
+            'proporcion': round(len(comprimido) / len(compacto), 4)
+        }
+
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--facturas', type=int, help='Facturas del listado (por defecto igual a --clientes)')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    resultados = []
+    for clientes in args.clientes:
+        cargas = construir_cargas(clientes, args.facturas or clientes, args.semilla)
+        resultados.append({
+            'clientes': clientes,
+            'facturas': args.facturas or clientes,
+            'cargas': {nombre: medir_carga(carga, args.repeticiones) for nombre, carga in cargas.items()}
+        })
+
+    print(json.dumps({
+        'orjson': respuestas.orjson is not None,
+        'resultados': resultados,
+        'pico_rss_mib': pico_rss_mib()
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+# [file name]: benchmarks/generador_datos.py
+"""
+Genera XML sintéticos de configuración y de consumos con el mismo esquema
+que aceptan XMLConfigProcessor y XMLConsumoProcessor, para pruebas de carga.
+
+Los archivos se escriben registro por registro, así la memoria no depende
+del tamaño de la salida. Con la misma semilla y parámetros la salida es
+idéntica. Los NIT e ids de instancia se derivan de la posición del
+cliente, por lo que un archivo de consumos generado con los mismos
+--clientes e --instancias-por-cliente siempre apunta a instancias que
+existen en el de configuración.
+
+Uso (desde backend/):
+    python -m benchmarks.generador_datos configuracion --clientes 10000 -o config.xml
+    python -m benchmarks.generador_datos consumos --clientes 10000 --consumos 5000000 --sesgo 1.1 -o consumos.xml
+    python -m benchmarks.generador_datos consumos --consumos 1000000 | gzip > consumos.xml.gz
+"""
+import argparse
+import random
+import sys
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+TIPOS_RECURSO = ('Hardware', 'Software')
+METRICAS = ('núcleo', 'GiB', 'licencia', 'IOPS', 'GB')
+CARGAS_TRABAJO = ('baja', 'media', 'alta')
+LUGARES = ('Guatemala', 'Mixco', 'Quetzaltenango', 'Antigua Guatemala')
+
+
+def nit_cliente(indice):
+    """NIT del cliente en la posición `indice` (empezando en 0)."""
+    return f'{100000 + indice}-{"0123456789K"[indice % 11]}'
+
+
+def id_instancia(indice_cliente, indice_instancia, instancias_por_cliente):
+    """Id único de la instancia `indice_instancia` del cliente `indice_cliente`."""
+    return indice_cliente * instancias_por_cliente + indice_instancia + 1
+
+
+def _fecha(fecha_inicio, dias):
+    return (fecha_inicio + timedelta(days=dias)).strftime('%d/%m/%Y')
+
+
+def escribir_configuracion(salida, recursos=20, categorias=5, configuraciones_por_categoria=4,
+                           clientes=100, instancias_por_cliente=3, canceladas=0.1,
+                           fecha_inicio=datetime(2024, 1, 1), dias=365, semilla=42):
+    """
+    Escribe un XML de configuración (archivoConfiguraciones).
+
+    Args:
+        salida: Archivo de texto abierto para escritura
+        canceladas: Fracción de instancias en estado Cancelada
+
+    Returns:
+        dict: Cantidad de elementos escritos
+    """
+    aleatorio = random.Random(semilla)
+    escribir = salida.write
+
+    escribir('<?xml version="1.0" encoding="utf-8"?>\n<archivoConfiguraciones>\n  <listaRecursos>\n')
+    for i in range(1, recursos + 1):
+        escribir(
+            f'    <recurso id="{i}">'
+            f'<nombre>Recurso {i}</nombre>'
+            f'<abreviatura>R{i}</abreviatura>'
+            f'<metrica>{METRICAS[i % len(METRICAS)]}</metrica>'
+            f'<tipo>{TIPOS_RECURSO[i % 2]}</tipo>'
+            f'<valorXhora>{round(aleatorio.uniform(0.05, 5.0), 2)}</valorXhora>'
+            f'</recurso>\n'
+        )
+
+    escribir('  </listaRecursos>\n  <listaCategorias>\n')
+    total_configuraciones = categorias * configuraciones_por_categoria
+    id_config = 0
+    for i in range(1, categorias + 1):
+        escribir(
+            f'    <categoria id="{i}"><nombre>Categoría {i}</nombre>'
+            f'<descripcion>Categoría sintética {i}</descripcion>'
+            f'<cargaTrabajo>{CARGAS_TRABAJO[i % len(CARGAS_TRABAJO)]}</cargaTrabajo>\n'
+            f'      <listaConfiguraciones>\n'
+        )
+        for _ in range(configuraciones_por_categoria):
+            id_config += 1
+            escribir(
+                f'        <configuracion id="{id_config}"><nombre>Configuración {id_config}</nombre>'
+                f'<descripcion>Configuración sintética {id_config}</descripcion><recursosConfiguracion>'
+            )
+            for id_recurso in sorted(aleatorio.sample(range(1, recursos + 1), min(recursos, 3))):
+                escribir(f'<recurso id="{id_recurso}">{aleatorio.randint(1, 16)}</recurso>')
+            escribir('</recursosConfiguracion></configuracion>\n')
+        escribir('      </listaConfiguraciones>\n    </categoria>\n')
+
+    escribir('  </listaCategorias>\n  <listaClientes>\n')
+    for i in range(clientes):
+        escribir(
+            f'    <cliente nit="{nit_cliente(i)}"><nombre>Cliente {i}</nombre>'
+            f'<usuario>cliente{i}</usuario><clave>clave{i}</clave>'
+            f'<direccion>Zona {1 + i % 25}, Ciudad de Guatemala</direccion>'
+            f'<correoElectronico>cliente{i}@ejemplo.com</correoElectronico>\n'
+            f'      <listaInstancias>\n'
+        )
+        for j in range(instancias_por_cliente):
+            inicio = aleatorio.randrange(max(dias, 1))
+            if aleatorio.random() < canceladas:
+                estado = 'Cancelada'
+                final = _fecha(fecha_inicio, aleatorio.randint(inicio, max(dias, 1)))
+            else:
+                estado = 'Vigente'
+                final = ''
+            escribir(
+                f'        <instancia id="{id_instancia(i, j, instancias_por_cliente)}">'
+                f'<idConfiguracion>{aleatorio.randint(1, max(total_configuraciones, 1))}</idConfiguracion>'
+                f'<nombre>instancia-{i}-{j}</nombre>'
+                f'<fechaInicio>{_fecha(fecha_inicio, inicio)}</fechaInicio>'
+                f'<estado>{estado}</estado><fechaFinal>{final}</fechaFinal></instancia>\n'
+            )
+        escribir('      </listaInstancias>\n    </cliente>\n')
+
+    escribir('  </listaClientes>\n</archivoConfiguraciones>\n')
+
+    return {
+        'recursos': recursos,
+        'categorias': categorias,
+        'configuraciones': total_configuraciones,
+        'clientes': clientes,
+        'instancias': clientes * instancias_por_cliente
+    }
+
+
+def escribir_consumos(salida, consumos=1000, clientes=100, instancias_por_cliente=3, sesgo=0.0,
+                      fecha_inicio=datetime(2024, 1, 1), dias=365, con_lugar=0.5, semilla=42):
+    """
+    Escribe un XML de consumos (listadoConsumos).
+
+    Args:
+        salida: Archivo de texto abierto para escritura
+        sesgo: Exponente Zipf del reparto entre clientes (0 = uniforme;
+            con 1 o más unos pocos clientes concentran la mayoría)
+        con_lugar: Fracción de fechas con prefijo de lugar ("Guatemala, ...")
+
+    Returns:
+        dict: Cantidad de consumos escritos
+    """
+    aleatorio = random.Random(semilla)
+    escribir = salida.write
+
+    # Pesos acumulados para elegir cliente; ocupan memoria por cliente, no por consumo
+    acumulados = list(accumulate(1 / (rango ** sesgo) for rango in range(1, clientes + 1)))
+    total = acumulados[-1]
+    minutos = max(dias, 1) * 24 * 60
+
+    escribir('<?xml version="1.0" encoding="utf-8"?>\n<listadoConsumos>\n')
+    for _ in range(consumos):
+        cliente = min(bisect_left(acumulados, aleatorio.random() * total), clientes - 1)
+        instancia = id_instancia(cliente, aleatorio.randrange(instancias_por_cliente), instancias_por_cliente)
+        momento = (fecha_inicio + timedelta(minutes=aleatorio.randrange(minutos))).strftime('%d/%m/%Y %H:%M')
+        if aleatorio.random() < con_lugar:
+            momento = f'{aleatorio.choice(LUGARES)}, {momento}'
+        escribir(
+            f'  <consumo nitCliente="{nit_cliente(cliente)}" idInstancia="{instancia}">'
+            f'<tiempo>{round(aleatorio.uniform(0.25, 24.0), 2)}</tiempo>'
+            f'<fechaHora>{momento}</fechaHora></consumo>\n'
+        )
+
+    escribir('</listadoConsumos>\n')
+
+    return {'consumos': consumos}
+
+
+def _fecha_argumento(texto):
+    try:
+        return datetime.strptime(texto, '%d/%m/%Y')
+    except ValueError:
+        raise argparse.ArgumentTypeError('Formato de fecha inválido. Use dd/mm/yyyy')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='tipo', required=True)
+
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument('-o', '--salida', default='-', help='Archivo de salida (- para stdout)')
+    comunes.add_argument('--clientes', type=int, default=100)
+    comunes.add_argument('--instancias-por-cliente', type=int, default=3)
+    comunes.add_argument('--fecha-inicio', type=_fecha_argumento, default=datetime(2024, 1, 1))
+    comunes.add_argument('--dias', type=int, default=365, help='Días cubiertos desde --fecha-inicio')
+    comunes.add_argument('--semilla', type=int, default=42)
+
+    config = subparsers.add_parser('configuracion', parents=[comunes], help='XML de configuración')
+    config.add_argument('--recursos', type=int, default=20)
+    config.add_argument('--categorias', type=int, default=5)
+    config.add_argument('--configuraciones-por-categoria', type=int, default=4)
+    config.add_argument('--canceladas', type=float, default=0.1)
+
+    consumos = subparsers.add_parser('consumos', parents=[comunes], help='XML de consumos')
+    consumos.add_argument('--consumos', type=int, default=1000)
+    consumos.add_argument('--sesgo', type=float, default=0.0)
+    consumos.add_argument('--con-lugar', type=float, default=0.5)
+
+    args = parser.parse_args(argv)
+    if args.clientes < 1 or args.instancias_por_cliente < 1:
+        parser.error('--clientes e --instancias-por-cliente deben ser al menos 1')
+
+    salida = sys.stdout if args.salida == '-' else open(args.salida, 'w', encoding='utf-8', buffering=1024 * 1024)
+    comunes_kwargs = {
+        'clientes': args.clientes,
+        'instancias_por_cliente': args.instancias_por_cliente,
+        'fecha_inicio': args.fecha_inicio,
+        'dias': args.dias,
+        'semilla': args.semilla
+    }
+
+    try:
+        if args.tipo == 'configuracion':
+            resultado = escribir_configuracion(
+                salida,
+                recursos=args.recursos,
+                categorias=args.categorias,
+                configuraciones_por_categoria=args.configuraciones_por_categoria,
+                canceladas=args.canceladas,
+                **comunes_kwargs
+            )
+        else:
+            resultado = escribir_consumos(
+                salida,
+                consumos=args.consumos,
+                sesgo=args.sesgo,
+                con_lugar=args.con_lugar,
+                **comunes_kwargs
+            )
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+    print(resultado, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
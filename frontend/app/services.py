@@ -1,25 +1,58 @@
 # [file name]: app/services.py
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def _crear_sesion():
+    """
+    Sesión HTTP compartida por todas las llamadas al backend. Mantiene un
+    pool de conexiones keep-alive, así cada página no abre una conexión
+    TCP nueva por llamada. Solo se reintentan los GET, que no modifican
+    datos; un POST que falló a medias no se repite. Un GET que agotó el
+    timeout de lectura tampoco: repetirlo solo multiplicaría la espera.
+    """
+    reintentos = Retry(
+        total=settings.BACKEND_REINTENTOS_GET,
+        read=False,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        raise_on_status=False
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.BACKEND_POOL_CONEXIONES,
+        max_retries=reintentos
+    )
+    
+    sesion = requests.Session()
+    sesion.mount('http://', adaptador)
+    sesion.mount('https://', adaptador)
+    sesion.headers.update({'Content-Type': 'application/json'})
+    return sesion
 
 class BackendService:
     BASE_URL = settings.BACKEND_URL
+    # (conexión, lectura) en segundos; requests no tiene timeout por defecto
+    TIMEOUT = (settings.BACKEND_TIMEOUT_CONEXION, settings.BACKEND_TIMEOUT_LECTURA)
+    # Las cargas XML responden después de procesar y guardar todo el archivo
+    TIMEOUT_CARGA = (settings.BACKEND_TIMEOUT_CONEXION, settings.BACKEND_TIMEOUT_CARGA)
+    sesion = _crear_sesion()
+    # Hilos para consultas simultáneas; tantos como conexiones tiene el pool
+    hilos = ThreadPoolExecutor(max_workers=settings.BACKEND_POOL_CONEXIONES, thread_name_prefix='backend')
     
     @staticmethod
     def _make_request(method, endpoint, data=None):
         try:
             url = f"{BackendService.BASE_URL}/{endpoint}"
-            headers = {'Content-Type': 'application/json'}
             
-            if method == 'GET':
-                response = requests.get(url, headers=headers)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
+            if method in ('POST', 'PUT'):
+                response = BackendService.sesion.request(method, url, json=data, timeout=BackendService.TIMEOUT)
+            else:
+                response = BackendService.sesion.request(method, url, timeout=BackendService.TIMEOUT)
             
             if response.status_code == 200:
                 return response.json() if response.content else {'success': True}
@@ -28,9 +61,26 @@ class BackendService:
                 
         except requests.exceptions.ConnectionError:
             return {'success': False, 'message': 'No se puede conectar al backend Flask'}
+        except requests.exceptions.Timeout:
+            return {'success': False, 'message': 'El backend Flask no respondió a tiempo'}
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @staticmethod
+    def obtener_varios(consultas):
+        """
+        Hace varias consultas al backend al mismo tiempo, así la página
+        espera a la más lenta y no a la suma de todas.
+        
+        Args:
+            consultas (dict): {nombre: método de BackendService sin argumentos}
+            
+        Returns:
+            dict: {nombre: respuesta de esa consulta}
+        """
+        futuros = {nombre: BackendService.hilos.submit(consulta) for nombre, consulta in consultas.items()}
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+    
     # Recursos
     @staticmethod
     def obtener_recursos():
@@ -81,8 +131,14 @@ class BackendService:
         try:
             url = f"{BackendService.BASE_URL}/sistema/cargar-configuracion"
             files = {'file': archivo}
-            response = requests.post(url, files=files)
+            # Sin el Content-Type JSON de la sesión: requests arma el multipart
+            response = BackendService.sesion.post(url, files=files, headers={'Content-Type': None},
+                                                  timeout=BackendService.TIMEOUT_CARGA)
             return response.json()
+        except requests.exceptions.ConnectionError:
+            return {'success': False, 'message': 'No se puede conectar al backend Flask'}
+        except requests.exceptions.Timeout:
+            return {'success': False, 'message': 'El backend Flask no respondió a tiempo'}
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
@@ -91,8 +147,14 @@ class BackendService:
         try:
             url = f"{BackendService.BASE_URL}/sistema/cargar-consumos"
             files = {'file': archivo}
-            response = requests.post(url, files=files)
+            # Sin el Content-Type JSON de la sesión: requests arma el multipart
+            response = BackendService.sesion.post(url, files=files, headers={'Content-Type': None},
+                                                  timeout=BackendService.TIMEOUT_CARGA)
             return response.json()
+        except requests.exceptions.ConnectionError:
+            return {'success': False, 'message': 'No se puede conectar al backend Flask'}
+        except requests.exceptions.Timeout:
+            return {'success': False, 'message': 'El backend Flask no respondió a tiempo'}
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
@@ -6,6 +6,9 @@ import json
 from .services import BackendService
 from .pdf_generator import generar_pdf_factura, generar_pdf_analisis
 
+# Extensiones aceptadas por el backend para los mensajes XML
+EXTENSIONES_XML = ('.xml', '.gz', '.xz', '.bz2')
+
 def home(request):
     """Página principal - Dashboard"""
     estado = BackendService.obtener_estado_sistema()
@@ -20,8 +23,8 @@ def configuracion_xml(request):
     """Enviar mensaje de configuración XML"""
     if request.method == 'POST' and request.FILES.get('archivo_xml'):
         archivo = request.FILES['archivo_xml']
-        if not archivo.name.endswith('.xml'):
-            messages.error(request, 'El archivo debe ser XML')
+        if not archivo.name.lower().endswith(EXTENSIONES_XML):
+            messages.error(request, 'El archivo debe ser XML (se acepta comprimido con gzip, xz o bz2)')
         else:
             resultado = BackendService.cargar_configuracion_xml(archivo)
             if resultado.get('success'):
@@ -35,8 +38,8 @@ def consumos_xml(request):
     """Enviar mensaje de consumos XML"""
     if request.method == 'POST' and request.FILES.get('archivo_xml'):
         archivo = request.FILES['archivo_xml']
-        if not archivo.name.endswith('.xml'):
-            messages.error(request, 'El archivo debe ser XML')
+        if not archivo.name.lower().endswith(EXTENSIONES_XML):
+            messages.error(request, 'El archivo debe ser XML (se acepta comprimido con gzip, xz o bz2)')
         else:
             resultado = BackendService.cargar_consumos_xml(archivo)
             if resultado.get('success'):
@@ -62,11 +65,18 @@ def inicializar_sistema(request):
 
 def consultar_datos(request):
     """Consultar todos los datos del sistema"""
-    recursos = BackendService.obtener_recursos()
-    categorias = BackendService.obtener_categorias()
-    clientes = BackendService.obtener_clientes()
-    estado = BackendService.obtener_estado_sistema()
-    consumos_pendientes = BackendService.obtener_consumos_pendientes()
+    respuestas = BackendService.obtener_varios({
+        'recursos': BackendService.obtener_recursos,
+        'categorias': BackendService.obtener_categorias,
+        'clientes': BackendService.obtener_clientes,
+        'estado': BackendService.obtener_estado_sistema,
+        'consumos_pendientes': BackendService.obtener_consumos_pendientes,
+    })
+    recursos = respuestas['recursos']
+    categorias = respuestas['categorias']
+    clientes = respuestas['clientes']
+    estado = respuestas['estado']
+    consumos_pendientes = respuestas['consumos_pendientes']
     
     context = {
         'recursos': recursos.get('data', []) if recursos.get('success') else [],
@@ -94,4 +94,10 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ✅ Configuración del backend Flask
-BACKEND_URL = 'http://127.0.0.1:5000/api'
\ No newline at end of file
+BACKEND_URL = 'http://127.0.0.1:5000/api'
+# Conexiones al backend: una sesión compartida que reutiliza conexiones (keep-alive)
+BACKEND_TIMEOUT_CONEXION = 3.05     # segundos para abrir la conexión
+BACKEND_TIMEOUT_LECTURA = 30        # segundos esperando la respuesta
+BACKEND_TIMEOUT_CARGA = None        # segundos esperando la respuesta de una carga XML (None: sin límite)
+BACKEND_POOL_CONEXIONES = 10        # conexiones abiertas que se conservan para reutilizar
+BACKEND_REINTENTOS_GET = 2          # reintentos de los GET ante fallos de conexión o 502/503/504
\ No newline at end of file